@@ -1,23 +1,42 @@
-from flask import Flask, request, jsonify, send_from_directory, Response
+from flask import Flask, request, jsonify, Response
 from flask_cors import CORS
 from groq import Groq
 from dotenv import load_dotenv
-import os, sqlite3, time, uuid, re, io, urllib.request, json as _json
+import os, sqlite3, time, uuid, re, io, gzip, hashlib, heapq, queue, threading, functools, urllib.request, json as _json
 from datetime import datetime
+from symptom_lexicon import resolve_locally
+from llm_scheduler import LLMScheduler
+from traces import TraceRecorder
+from sites import Site, load_sites
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 load_dotenv()
 
 app    = Flask(__name__)
 CORS(app)
 
+# Opt-in request tracing / replay — see traces.py
+TRACE = TraceRecorder.from_env()
+TRACE.init_app(app)
+
 client  = Groq(api_key=os.getenv("GROQ_API_KEY"))
-DB_PATH = "voicebyte.db"
+DB_PATH = "voicebyte.db"   # built-in single-site DB; multi-site shards are set per site config
 
 # ─────────────────────────────
 #  DATABASE
 # ─────────────────────────────
-def init_db():
-    conn = sqlite3.connect(DB_PATH)
+def init_db(site=None):
+    if site is None:
+        for s in SITES: init_db(s)
+        return
+    with site.db() as conn:
+        _create_schema(conn)
+
+def _create_schema(conn):
     conn.execute('''
         CREATE TABLE IF NOT EXISTS patients (
             id                  INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -36,23 +55,25 @@ def init_db():
             language            TEXT,
             visit_time          TEXT,
             token_number        INTEGER DEFAULT 0,
-            status              TEXT DEFAULT 'waiting'
+            status              TEXT DEFAULT 'waiting',
+            called_time         TEXT,
+            seen_time           TEXT,
+            client_key          TEXT
         )
     ''')
-    for col, defn in [("token_number","INTEGER DEFAULT 0"),("status","TEXT DEFAULT 'waiting'")]:
+    for col, defn in [("token_number","INTEGER DEFAULT 0"),("status","TEXT DEFAULT 'waiting'"),
+                      ("called_time","TEXT"),("seen_time","TEXT"),("client_key","TEXT")]:
         try: conn.execute(f"ALTER TABLE patients ADD COLUMN {col} {defn}")
         except: pass
+    # Idempotency keys from offline kiosks — NULL for normal /process rows
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_patients_client_key ON patients(client_key)")
     conn.commit()
-    conn.close()
 
-def get_next_token():
+def get_next_token(c):
+    # Call with the cursor of an open write transaction so allocation is race-free
     today = datetime.now().strftime('%Y-%m-%d')
-    conn  = sqlite3.connect(DB_PATH)
-    c     = conn.cursor()
     c.execute("SELECT COUNT(*) FROM patients WHERE DATE(visit_time)=?", (today,))
-    n = c.fetchone()[0]
-    conn.close()
-    return n + 1
+    return c.fetchone()[0] + 1
 
 FAST2SMS_KEY = os.getenv("FAST2SMS_KEY","")
 
@@ -73,34 +94,34 @@ SMS_TPL = {
     }
 }
 
-def send_sms(mobile, mtype, token, dept, floor, lang="English"):
+def send_sms(mobile, mtype, token, dept, floor, lang="English", site=None):
     if not FAST2SMS_KEY or not mobile or len(str(mobile))<10:
         print(f"[SMS SKIP] key={bool(FAST2SMS_KEY)} mobile={mobile}")
         return False
     try:
-        l   = lang if lang in SMS_TPL[mtype] else "English"
-        msg = SMS_TPL[mtype][l].format(t=token,d=dept,f=floor)
+        tpl = site.sms_tpl if site else SMS_TPL
+        l   = lang if lang in tpl[mtype] else "English"
+        msg = tpl[mtype][l].format(t=token,d=dept,f=floor)
         data = _json.dumps({"route":"q","message":msg,"language":"english","flash":0,"numbers":str(mobile)[-10:]}).encode()
         req  = urllib.request.Request("https://www.fast2sms.com/dev/bulkV2",data=data,
                headers={"authorization":FAST2SMS_KEY,"Content-Type":"application/json"})
-        urllib.request.urlopen(req,timeout=6)
+        TRACE.upstream('sms', lambda: urllib.request.urlopen(req,timeout=6).status)
         print(f"[SMS OK] {mtype} token={token} -> {mobile}")
         return True
     except Exception as e:
         print(f"[SMS ERR] {e}")
         return False
 
-def save_patient(data):
-    conn  = sqlite3.connect(DB_PATH)
-    c     = conn.cursor()
-    reg   = f"VBT-{datetime.now().strftime('%Y%m%d')}-{str(uuid.uuid4())[:3].upper()}"
-    token = get_next_token()
+def new_registration_number():
+    return f"VBT-{datetime.now().strftime('%Y%m%d')}-{str(uuid.uuid4())[:3].upper()}"
+
+def insert_patient(c, data, reg, token, client_key=None):
     c.execute('''
         INSERT INTO patients
         (registration_number,name,age,mobile,symptoms_keywords,days_suffering,
          department,floor_number,floor_word,emergency,priority,doctor,language,visit_time,
-         token_number,status)
-        VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
+         token_number,status,client_key)
+        VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
     ''', (
         reg,
         data.get('name',''),
@@ -116,37 +137,242 @@ def save_patient(data):
         data.get('doctor',''),
         data.get('language','English'),
         datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-        token, 'waiting'
+        token, 'waiting', client_key
     ))
-    conn.commit()
-    conn.close()
+    return c.lastrowid
+
+def find_client_key(site, key):
+    with site.db() as conn:
+        r = conn.execute("SELECT * FROM patients WHERE client_key=?",(key,)).fetchone()
+    return dict(r) if r else None
+
+def save_patient(data, site, client_key=None):
+    """Returns (reg, token), or None when client_key is already registered
+    (a retry that raced the first attempt or an outbox flush)."""
+    with site.db() as conn:
+        c     = conn.cursor()
+        c.execute("BEGIN IMMEDIATE")
+        if client_key:
+            c.execute("SELECT 1 FROM patients WHERE client_key=?",(client_key,))
+            if c.fetchone():
+                conn.rollback()
+                return None
+        reg   = new_registration_number()
+        token = get_next_token(c)
+        pid   = insert_patient(c, data, reg, token, client_key)
+        conn.commit()
+    site.sched.enqueue({'id':pid,'token_number':token,'department':data.get('department',''),
+                   'emergency':1 if data.get('emergency') else 0,'priority':data.get('priority','Normal')})
     return reg, token
 
+# ─────────────────────────────
+#  QUEUE SCHEDULER
+#  Per-department priority heaps: Emergency → High → Normal, ties by token.
+#  Kept in memory and updated incrementally by /process, /admin/call
+#  and /admin/seen — the DB is only read once per day to hydrate.
+# ─────────────────────────────
+TS_FMT          = '%Y-%m-%d %H:%M:%S'
+DEFAULT_SERVICE = 10 * 60   # seconds per patient until real timings arrive
+SERVICE_ALPHA   = 0.3       # EWMA weight of the newest consultation
+
+def queue_rank(row):
+    if row.get('emergency') in (1, True, '1'): return 0
+    if row.get('priority') == 'High':          return 1
+    return 2
+
+class DeptQueue:
+    """Heap of waiting patients for one department. Removal is lazy so
+    push, pop and discard are all O(log n) amortised."""
+
+    def __init__(self, name):
+        self.name    = name
+        self.heap    = []
+        self.entries = {}             # id -> [rank, token, id, alive]
+        self.current = {}             # id -> called_at (patients with the doctor)
+        self.service = DEFAULT_SERVICE
+
+    def push(self, row):
+        pid = row['id']
+        self.discard(pid)
+        entry = [queue_rank(row), row.get('token_number') or 0, pid, True]
+        self.entries[pid] = entry
+        heapq.heappush(self.heap, entry)
+
+    def discard(self, pid):
+        entry = self.entries.pop(pid, None)
+        if entry: entry[3] = False
+
+    def _prune(self):
+        while self.heap and not self.heap[0][3]:
+            heapq.heappop(self.heap)
+
+    def peek(self):
+        self._prune()
+        return self.heap[0][2] if self.heap else None
+
+    def pop(self):
+        self._prune()
+        if not self.heap: return None
+        entry = heapq.heappop(self.heap)
+        del self.entries[entry[2]]
+        return entry[2]
+
+    def order(self):
+        return [e[2] for e in sorted(self.entries.values())]
+
+    def record_service(self, seconds):
+        if seconds > 0:
+            self.service = SERVICE_ALPHA * seconds + (1 - SERVICE_ALPHA) * self.service
+
+    def remaining_current(self, now):
+        # Time left for whoever is with the doctor right now (longest-running one)
+        if not self.current: return 0
+        elapsed = now - min(self.current.values())
+        return max(0, self.service - elapsed)
+
+class QueueScheduler:
+    """One per site — reads only that site's shard."""
+
+    def __init__(self, site):
+        self.site   = site
+        self.lock   = threading.Lock()
+        self.day    = None
+        self.queues = {}
+
+    def _queue(self, dept):
+        q = self.queues.get(dept)
+        if q is None:
+            q = self.queues[dept] = DeptQueue(dept)
+        return q
+
+    def _ensure_day(self):
+        # Hydrate from the DB on first use and again after midnight
+        today = datetime.now().strftime('%Y-%m-%d')
+        if self.day == today: return
+        self.day, self.queues = today, {}
+        with self.site.db() as conn:
+            try:
+                rows = conn.execute("SELECT id,token_number,department,emergency,priority,status,called_time,seen_time "
+                                    "FROM patients WHERE DATE(visit_time)=? ORDER BY token_number ASC",(today,)).fetchall()
+            except sqlite3.OperationalError:
+                rows = []
+        for r in rows:
+            r = dict(r)
+            q = self._queue(r['department'] or '')
+            called = _parse_ts(r.get('called_time'))
+            if r['status'] == 'waiting':
+                if r['department']: q.push(r)   # untriaged batch rows join after triage
+            elif r['status'] == 'called':
+                q.current[r['id']] = called or time.time()
+            elif r['status'] == 'seen' and called:
+                seen = _parse_ts(r.get('seen_time'))
+                if seen: q.record_service(seen - called)
+
+    def enqueue(self, row):
+        with self.lock:
+            self._ensure_day()
+            self._queue(row.get('department') or '').push(row)
+
+    def mark_called(self, row, at=None):
+        with self.lock:
+            self._ensure_day()
+            q = self._queue(row.get('department') or '')
+            # Only a waiting patient moves to the doctor; re-calling a called
+            # or seen token must not add it to `current` again
+            if row['id'] in q.entries:
+                q.discard(row['id'])
+                q.current[row['id']] = at or time.time()
+
+    def mark_seen(self, row, at=None):
+        with self.lock:
+            self._ensure_day()
+            q = self._queue(row.get('department') or '')
+            q.discard(row['id'])
+            called = q.current.pop(row['id'], None)
+            if called: q.record_service((at or time.time()) - called)
+
+    def next_for(self, dept=None, doctor=None):
+        """Pop the next waiting patient id for a department/doctor (or across
+        all departments when neither is given). Returns None if nobody waits."""
+        with self.lock:
+            self._ensure_day()
+            if doctor and not dept:
+                dept = self.site.doctor_dept.get(doctor)
+                if dept is None: return None
+            if dept:
+                q = self.queues.get(dept)
+                return q.pop() if q else None
+            best = None
+            for q in self.queues.values():
+                pid = q.peek()
+                if pid is None: continue
+                key = q.heap[0][:3]
+                if best is None or key < best[0]: best = (key, q)
+            return best[1].pop() if best else None
+
+    def snapshot(self, dept=None):
+        """Queue order plus estimated wait (minutes) for every waiting patient."""
+        with self.lock:
+            self._ensure_day()
+            now, out = time.time(), {}
+            for name, q in self.queues.items():
+                if dept and name != dept: continue
+                head = q.remaining_current(now)
+                order = q.order()
+                out[name] = {
+                    'waiting': len(order),
+                    'with_doctor': len(q.current),
+                    'avg_service_min': round(q.service / 60, 1),
+                    'queue': [{'id':pid,'position':i+1,'est_wait_min':round((head + i*q.service)/60)}
+                              for i, pid in enumerate(order)],
+                }
+            return out
+
+def _parse_ts(ts):
+    try: return time.mktime(datetime.strptime(ts, TS_FMT).timetuple())
+    except (TypeError, ValueError): return None
+
 # ─────────────────────────────
 #  GROQ HELPER
 # ─────────────────────────────
-def ask_groq(system_prompt, user_msg, max_tok=150):
-    # Retry up to 3 times if Groq fails
-    last_error = None
-    for attempt in range(3):
-        try:
-            response = client.chat.completions.create(
-                model="llama-3.3-70b-versatile",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user",   "content": user_msg}
-                ],
-                max_tokens=max_tok,
-                temperature=0.0,
-                timeout=15
-            )
-            return response.choices[0].message.content.strip()
-        except Exception as e:
-            last_error = e
-            print(f"[Groq attempt {attempt+1} failed]: {e}")
-            time.sleep(1)  # wait 1 second before retry
-    print(f"[Groq all retries failed]: {last_error}")
-    raise last_error
+# All calls share one scheduler: bounded concurrency, RPM/TPM buckets and
+# priority lanes (triage > interactive > background). Limits default to
+# Groq's free tier for llama-3.3-70b; override via env on paid plans.
+def _groq_call(system_prompt, user_msg, max_tok):
+    # Runs on a scheduler worker; traces time only the upstream request
+    usage = []
+    def call():
+        response = client.chat.completions.create(
+            model="llama-3.3-70b-versatile",
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user",   "content": user_msg}
+            ],
+            max_tokens=max_tok,
+            temperature=0.0,
+            timeout=15
+        )
+        usage.append(getattr(getattr(response, 'usage', None), 'total_tokens', None))
+        return response.choices[0].message.content.strip()
+    text = TRACE.upstream('groq', call)
+    return text, usage[0] if usage else None   # replayed calls report no usage
+
+def make_llm_scheduler(call, **overrides):
+    """The production scheduler; tests build it here with a fake `call`."""
+    config = dict(concurrency=int(os.getenv("GROQ_CONCURRENCY", 4)),
+                  rpm=int(os.getenv("GROQ_RPM", 30)),
+                  tpm=int(os.getenv("GROQ_TPM", 6000)),
+                  trace=TRACE)
+    config.update(overrides)
+    return LLMScheduler(call, **config)
+
+LLM = make_llm_scheduler(_groq_call)
+# Every lane is bounded: callers fall back to keyword scoring rather than block
+LLM_TIMEOUT = {'triage':45, 'interactive':45, 'background':300}
+
+def ask_groq(system_prompt, user_msg, max_tok=150, lane='interactive'):
+    # Retries (up to 3) happen inside the scheduler and re-queue behind the rate limit
+    return LLM.submit(system_prompt, user_msg, max_tok, lane=lane, timeout=LLM_TIMEOUT[lane])
 
 # ─────────────────────────────
 #  WORD-TO-DIGIT MAP
@@ -375,21 +601,64 @@ DEPTS = {
 EM_WORDS = ['chest pain','heart attack','heavy bleeding','unconscious','seizure',
             'severe pain','accident','trauma','stroke','cannot breathe','breathing difficulty']
 
-def map_departments(symptoms, emergency):
+# ─────────────────────────────
+#  SITES
+#  The catalogs above are the built-in hospital. Config files in
+#  backend/sites/ (or VOICEBYTE_SITES_DIR) replace it with one Site per
+#  hospital, each with its own DB shard, pool, scheduler and keyword index.
+# ─────────────────────────────
+ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD", "voicebyte2024")
+SITES_DIR      = os.getenv("VOICEBYTE_SITES_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sites'))
+DEFAULT_SITE   = Site('default', 'VoiceByte', DEPTS, EM_WORDS, SMS_TPL, DB_PATH, ADMIN_PASSWORD)
+SITES          = load_sites(SITES_DIR, DEFAULT_SITE)
+for _site in SITES:
+    _site.sched = QueueScheduler(_site)
+# Every site's emergency words — local symptom resolution must never drop one
+EM_PHRASES = sorted({w for s in SITES for w in s.em_words})
+# Medical vocabulary that trace redaction may keep verbatim
+TRACE.allow_words(EM_PHRASES + [w for s in SITES for info in s.depts.values() for w in info.get('words', [])])
+
+def _replayed_site():
+    sid = TRACE.replayed_site()
+    return SITES.get(sid) if sid else None
+
+def current_site(admin=False):
+    """Admin routes resolve by admin key only (or, replaying a trace, by the
+    recorded site); kiosk routes by kiosk id or site id."""
+    if admin:
+        return SITES.for_admin_key(request.headers.get('X-Admin-Key') or request.args.get('key')) \
+               or _replayed_site()
+    return SITES.resolve(kiosk_id=request.headers.get('X-Kiosk-Id') or request.args.get('kiosk'),
+                         site_id=request.headers.get('X-VoiceByte-Site') or request.args.get('site'))
+
+def with_site(admin=False):
+    """Route decorator: resolve the caller's site and pass it as the first
+    argument, or refuse — a request never falls through to another hospital."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            site = current_site(admin)
+            if site is None:
+                if admin: return jsonify({'error':'unknown site — send X-Admin-Key'}),401
+                return jsonify({'error':'unknown site — send X-Kiosk-Id'}),400
+            TRACE.annotate(site=site.id, kiosk=None if admin else
+                           request.headers.get('X-Kiosk-Id') or request.args.get('kiosk'))
+            return fn(site, *args, **kwargs)
+        return inner
+    return wrap
+
+def map_departments(symptoms, emergency, lane='triage', site=None):
     """
     Uses Groq AI to determine departments like a real doctor would.
     Understands symptom relationships — fever+leg pain = General Medicine not Orthopedics.
     Returns (primary_dept, primary_info, all_depts_list)
     """
-    if emergency:
-        return 'Emergency', DEPTS['Emergency'], [{'name':'Emergency','floor':0,'fw':'Ground Floor','doctor':'Emergency Team','color':'#DC2626'}]
+    site  = site or DEFAULT_SITE
+    depts = site.depts
+    if emergency or site.is_emergency(symptoms):
+        return 'Emergency', depts['Emergency'], [site.dept_entry('Emergency')]
 
-    lower = symptoms.lower()
-    for w in EM_WORDS:
-        if w in lower:
-            return 'Emergency', DEPTS['Emergency'], [{'name':'Emergency','floor':0,'fw':'Ground Floor','doctor':'Emergency Team','color':'#DC2626'}]
-
-    dept_list = [d for d in DEPTS.keys() if d != 'Emergency']
+    dept_list = [d for d in depts.keys() if d != 'Emergency']
 
     prompt = f"""You are a hospital triage doctor. A patient has these symptoms: "{symptoms}"
 
@@ -403,6 +672,7 @@ Rules:
 - Pregnancy, periods, female reproductive issues = Gynecology
 - Child/baby/infant patients = Pediatrics
 - Everything else = General Medicine
+- Only ever answer with names from the available departments list
 - If symptoms belong to 2 different departments genuinely (e.g. knee fracture + chest pain) list both
 - Maximum 2 departments
 
@@ -411,46 +681,23 @@ Example: Cardiology
 Example: General Medicine, Orthopedics"""
 
     try:
-        raw = ask_groq(prompt, symptoms)
+        raw = ask_groq(prompt, symptoms, lane=lane)
         # Parse response
         chosen = [d.strip() for d in raw.split(',')]
-        # Validate — only accept known dept names
-        valid = [d for d in chosen if d in DEPTS]
+        # Validate — only accept this site's dept names
+        valid = [d for d in chosen if d in depts and d != 'Emergency']
         if not valid:
             valid = ['General Medicine']
     except Exception:
         # Fallback to keyword scoring if Groq fails
-        valid = ['General Medicine']
-        scores = {}
-        for dept, info in DEPTS.items():
-            if dept == 'Emergency': continue
-            score = sum(len(w.split()) for w in info['words'] if w in lower)
-            if score > 0: scores[dept] = score
-        if scores:
-            valid = [max(scores, key=scores.get)]
-
-    # Build response
-    all_depts = []
-    for dept_name in valid:
-        if dept_name not in DEPTS: continue
-        info = DEPTS[dept_name]
-        all_depts.append({
-            'name': dept_name,
-            'floor': info['floor'],
-            'fw': info['fw'],
-            'doctor': info['doctor'],
-            'color': info.get('color','#1252A3')
-        })
-
-    if not all_depts:
-        gm = DEPTS['General Medicine']
-        all_depts = [{'name':'General Medicine','floor':gm['floor'],'fw':gm['fw'],'doctor':gm['doctor'],'color':gm['color']}]
+        valid = [site.keyword_dept(symptoms) or 'General Medicine']
 
+    all_depts = [site.dept_entry(d) for d in valid] or [site.dept_entry('General Medicine')]
     primary = all_depts[0]['name']
-    return primary, DEPTS[primary], all_depts
+    return primary, depts[primary], all_depts
 
-def map_department(symptoms, emergency):
-    p, info, _ = map_departments(symptoms, emergency)
+def map_department(symptoms, emergency, site=None):
+    p, info, _ = map_departments(symptoms, emergency, site=site)
     return p, info
 
 # ─────────────────────────────
@@ -477,13 +724,15 @@ def tts():
 
     lang_code = GTTS_LANG_CODES.get(lang, 'en')
 
-    try:
+    def synthesize():
         from gtts import gTTS
         tts_obj = gTTS(text=text, lang=lang_code, slow=False)
         mp3_fp  = io.BytesIO()
         tts_obj.write_to_fp(mp3_fp)
-        mp3_fp.seek(0)
-        return Response(mp3_fp.read(), mimetype='audio/mpeg')
+        return mp3_fp.getvalue()
+
+    try:
+        return Response(TRACE.upstream('gtts', synthesize), mimetype='audio/mpeg')
     except ImportError:
         return jsonify({'error': 'gTTS not installed. Run: pip install gtts'}), 500
     except Exception as e:
@@ -491,15 +740,105 @@ def tts():
 
 # ─────────────────────────────
 #  SERVE FRONTEND
+#  Pages are resolved and loaded once at startup. Inline <style>/<script>
+#  blocks are split out into content-fingerprinted /assets/ files cached
+#  for a year; the HTML itself revalidates cheaply with a strong ETag.
+#  Every body is pre-compressed (gzip, plus Brotli if installed).
 # ─────────────────────────────
+BASE_DIR        = os.path.dirname(os.path.abspath(__file__))
+ASSET_MAX_AGE   = 365 * 24 * 3600
+PAGE_CACHE      = 'no-cache'
+ENCODING_ORDER  = ('br', 'gzip')
+
+def accepted_encodings(header):
+    """Parse Accept-Encoding into a predicate: coding -> acceptable (q > 0)."""
+    q = {}
+    for part in header.lower().split(','):
+        coding, *params = [p.strip() for p in part.split(';')]
+        if not coding: continue
+        weight = 1.0
+        for p in params:
+            if p.startswith('q='):
+                try: weight = float(p[2:])
+                except ValueError: weight = 0.0
+        q[coding] = weight
+    return lambda coding: q.get(coding, q.get('*', 0.0)) > 0
+
+class StaticAsset:
+    """An in-memory response body with pre-built encodings and a strong ETag."""
+
+    def __init__(self, body, mimetype, cache_control=PAGE_CACHE):
+        if isinstance(body, str): body = body.encode('utf-8')
+        self.mimetype      = mimetype
+        self.cache_control = cache_control
+        self.digest        = hashlib.sha256(body).hexdigest()[:16]
+        self.variants      = {'identity': body}
+        gz = gzip.compress(body, 9, mtime=0)
+        if len(gz) < len(body): self.variants['gzip'] = gz
+        if brotli is not None:
+            br = brotli.compress(body, quality=11)
+            if len(br) < len(body): self.variants['br'] = br
+
+    def etag(self, encoding):
+        # Strong ETags must differ per content-coding
+        return '"%s%s"' % (self.digest, '' if encoding == 'identity' else '-' + encoding)
+
+    def response(self, status=200):
+        accepted = accepted_encodings(request.headers.get('Accept-Encoding', ''))
+        encoding = next((e for e in ENCODING_ORDER if e in self.variants and accepted(e)), 'identity')
+        etag     = self.etag(encoding)
+        headers  = {'ETag': etag, 'Cache-Control': self.cache_control, 'Vary': 'Accept-Encoding'}
+        if status == 200:
+            # Only the variant negotiated for this request counts — a client
+            # holding the gzip body must not get a 304 for the identity one
+            sent = {t.strip().removeprefix('W/') for t in request.headers.get('If-None-Match', '').split(',')}
+            if '*' in sent or etag in sent:
+                return Response(status=304, headers=headers)
+        if encoding != 'identity': headers['Content-Encoding'] = encoding
+        return Response(self.variants[encoding], status=status, mimetype=self.mimetype, headers=headers)
+
+ASSETS = {}   # '<digest>.css' / '<digest>.js' -> StaticAsset
+
+def _fingerprint_inline(html):
+    """Move inline <style> and <script> blocks into fingerprinted assets."""
+    def extract(ext, mimetype, repl):
+        def sub(m):
+            asset = StaticAsset(m.group(1), mimetype, f'public, max-age={ASSET_MAX_AGE}, immutable')
+            name  = f'{asset.digest}.{ext}'
+            ASSETS[name] = asset
+            return repl.format(url='/assets/' + name)
+        return sub
+    html = re.sub(r'<style>(.*?)</style>', extract('css', 'text/css',
+                  '<link rel="stylesheet" href="{url}"/>'), html, flags=re.S)
+    html = re.sub(r'<script>(.*?)</script>', extract('js', 'application/javascript',
+                  '<script src="{url}"></script>'), html, flags=re.S)
+    return html
+
+def load_page(*names, cache_control=PAGE_CACHE):
+    # Works both locally and on Render: frontend/ may sit beside or above backend/
+    for d in (os.path.join(BASE_DIR, '..', 'frontend'), os.path.join(BASE_DIR, 'frontend'), BASE_DIR):
+        for name in names:
+            path = os.path.join(d, name)
+            if os.path.exists(path):
+                with open(path, encoding='utf-8') as f:
+                    return StaticAsset(_fingerprint_inline(f.read()), 'text/html', cache_control)
+    print(f"[STATIC] {names[0]} not found")
+    return None
+
+INDEX_PAGE = load_page('index.html')
+
 @app.route('/')
 @app.route('/app')
 def serve_frontend():
-    frontend_path = os.path.join(
-        os.path.dirname(os.path.abspath(__file__)),
-        '..', 'frontend'
-    )
-    return send_from_directory(frontend_path, 'index.html')
+    if INDEX_PAGE is None:
+        return "Frontend not found. Check index.html is in frontend folder.", 404
+    return INDEX_PAGE.response()
+
+@app.route('/assets/<name>')
+def serve_asset(name):
+    asset = ASSETS.get(name)
+    if asset is None: return jsonify({'error':'not found'}), 404
+    return asset.response()
 
 # ─────────────────────────────
 #  DETECT LANGUAGE
@@ -507,12 +846,15 @@ def serve_frontend():
 @app.route('/detect-language', methods=['POST'])
 def detect_language():
     transcript = request.json.get('transcript','')
-    lang_raw = ask_groq(
-        "Identify the language of this spoken text. "
-        "Return ONLY one word from: English, Hindi, Telugu, Tamil, Malayalam. "
-        "Default to English if unsure.",
-        transcript
-    )
+    try:
+        lang_raw = ask_groq(
+            "Identify the language of this spoken text. "
+            "Return ONLY one word from: English, Hindi, Telugu, Tamil, Malayalam. "
+            "Default to English if unsure.",
+            transcript
+        )
+    except Exception:
+        lang_raw = 'English'   # LLM busy or down (e.g. queue timeout) — same as "unsure"
     lang = lang_raw.strip()
     if lang not in ['English','Hindi','Telugu','Tamil','Malayalam']:
         lang = 'English'
@@ -579,9 +921,12 @@ def extract():
                         extracted = str(n)
                         break
             if not extracted:
-                raw = ask_groq(
-                    "Extract age number only (1-120). Return ONLY digits.",
-                    "Patient said: " + transcript, max_tok=10)
+                try:
+                    raw = ask_groq(
+                        "Extract age number only (1-120). Return ONLY digits.",
+                        "Patient said: " + transcript, max_tok=10)
+                except Exception:
+                    raw = ''
                 digits = re.sub(r"\D","",raw)
                 extracted = digits if digits and 1<=int(digits or 0)<=120 else 'Unknown'
 
@@ -608,7 +953,13 @@ def extract():
             "Rules: Return ONLY English medical terms comma separated. Max 4 terms. "
             "Keep body+pain together as one term like 'hand pain' not separate 'hand' and 'pain'."
         )
-        extracted = ask_groq(sym_prompt, "Patient said: " + transcript, max_tok=60)
+        # Common complaints resolve locally — Groq only sees what the lexicon can't place
+        extracted = resolve_locally(transcript, lang, EM_PHRASES)
+        if extracted is None:
+            try:
+                extracted = ask_groq(sym_prompt, "Patient said: " + transcript, max_tok=60)
+            except Exception:
+                extracted = ''   # falls through to 'general complaint' below
         if not extracted or len(extracted) > 150:
             extracted = 'general complaint'
 
@@ -639,16 +990,20 @@ def extract():
                 n = int(nums[0])
                 extracted = str(n) + (" day" if n==1 else " days") if n<=30 else str(n)+" weeks"
             else:
-                raw = ask_groq(
-                    "Convert to duration. Return ONLY like: 3 days or 1 week",
-                    "Patient said: " + transcript, max_tok=15)
+                try:
+                    raw = ask_groq(
+                        "Convert to duration. Return ONLY like: 3 days or 1 week",
+                        "Patient said: " + transcript, max_tok=15)
+                except Exception:
+                    raw = ''
                 extracted = raw.strip().split("\n")[0][:25] if raw else '1 day'
 
     return jsonify({'extracted': extracted.strip() if extracted else 'Unknown'})
 
 
 @app.route('/process', methods=['POST'])
-def process():
+@with_site()
+def process(site):
     body      = request.json
     symptoms  = body.get('symptoms','')
     days      = body.get('days','')
@@ -657,22 +1012,29 @@ def process():
     age       = body.get('age','')
     mobile    = body.get('mobile','')
     language  = body.get('language','English')
+    # Kiosks send one key per patient on every attempt; a retry gets the original token
+    key       = str(body.get('idempotency_key') or '').strip() or None
+
+    if key:
+        existing = find_client_key(site, key)
+        if existing: return jsonify(_process_replay(site, existing))
 
-    for w in EM_WORDS:
-        if w in symptoms.lower():
-            emergency = True
-            break
+    if site.is_emergency(symptoms):
+        emergency = True
 
-    dept_name, dept_info, all_depts = map_departments(symptoms, emergency)
+    dept_name, dept_info, all_depts = map_departments(symptoms, emergency, site=site)
     keywords  = [k.strip() for k in symptoms.split(',') if k.strip()]
     priority  = 'High' if emergency else 'Normal'
 
-    reg_no, token = save_patient({
+    saved = save_patient({
         'name':name,'age':age,'mobile':mobile,'symptoms':symptoms,'days':days,
         'department':dept_name,'floor':dept_info['floor'],'floorWord':dept_info['fw'],
         'emergency':emergency,'priority':priority,'doctor':dept_info['doctor'],'language':language
-    })
-    send_sms(mobile,'registration',token,dept_name,dept_info['floor'],language)
+    }, site, key)
+    if saved is None:
+        return jsonify(_process_replay(site, find_client_key(site, key)))
+    reg_no, token = saved
+    send_sms(mobile,'registration',token,dept_name,dept_info['floor'],language,site)
     return jsonify({
         'department':dept_name,'floor':dept_info['floor'],'floorWord':dept_info['fw'],
         'doctor':dept_info['doctor'],'keywords':keywords,'days':days,
@@ -680,30 +1042,189 @@ def process():
         'token_number':token,'all_departments':all_depts
     })
 
+# ─────────────────────────────
+#  BATCH REGISTRATION
+#  Offline-buffered kiosks flush registrations here. Each item carries a
+#  client-generated idempotency key, so retries return the original token.
+#  All items are inserted in one transaction; triage (Groq) and SMS run
+#  on a background worker afterwards so the kiosk never waits on them.
+# ─────────────────────────────
+BATCH_MAX     = 200
+_triage_jobs  = queue.Queue()
+_triage_start = threading.Lock()
+_triage_alive = False
+
+def _batch_result(row):
+    pending = not row['department']
+    return {
+        'idempotency_key':row['client_key'],'registration_number':row['registration_number'],
+        'token_number':row['token_number'],'emergency':bool(row['emergency']),
+        'priority':row['priority'],'department':None if pending else row['department'],
+        'floor':None if pending else row['floor_number'],'floorWord':None if pending else row['floor_word'],
+        'doctor':None if pending else row['doctor'],'triage':'pending' if pending else 'done',
+    }
+
+def _process_replay(site, row):
+    """/process response for a key that is already registered. The
+    department may still be pending if the outbox got there first."""
+    res = dict(_batch_result(row), duplicate=True)
+    res['keywords'] = [k.strip() for k in (row['symptoms_keywords'] or '').split(',') if k.strip()]
+    res['days']     = row['days_suffering']
+    res['all_departments'] = [site.dept_entry(row['department'])] if row['department'] in site.depts else []
+    return res
+
+def triage_registration(site, pid):
+    with site.db() as conn:
+        r = conn.execute("SELECT * FROM patients WHERE id=?",(pid,)).fetchone()
+    if r is None: return
+    row = dict(r)
+    if not row['department']:
+        # A patient is waiting at the hospital for this: triage lane, never the starvable background one
+        dept_name, dept_info, _ = map_departments(row['symptoms_keywords'] or '', bool(row['emergency']),
+                                                  lane='triage', site=site)
+        row.update(department=dept_name, floor_number=dept_info['floor'],
+                   floor_word=dept_info['fw'], doctor=dept_info['doctor'])
+        with site.db() as conn:
+            conn.execute("UPDATE patients SET department=?,floor_number=?,floor_word=?,doctor=? WHERE id=? AND department=''",
+                         (dept_name, dept_info['floor'], dept_info['fw'], dept_info['doctor'], pid))
+            conn.commit()
+        if row['status'] == 'waiting': site.sched.enqueue(row)
+    send_sms(row['mobile'],'registration',row['token_number'],row['department'],row['floor_number'],
+             row['language'] or 'English',site)
+
+def _triage_worker():
+    while True:
+        site, pid, ctx = _triage_jobs.get()
+        try:
+            with TRACE.resume(ctx):
+                triage_registration(site, pid)
+        except Exception as e:
+            print(f"[TRIAGE ERR] site={site.id} id={pid}: {e}")
+        finally:
+            _triage_jobs.task_done()
+
+def start_triage_worker():
+    """Start the background worker once, re-queueing any batch rows left
+    untriaged by a previous run."""
+    global _triage_alive
+    with _triage_start:
+        if _triage_alive: return
+        _triage_alive = True
+        for site in SITES:
+            with site.db() as conn:
+                try:
+                    for (pid,) in conn.execute("SELECT id FROM patients WHERE client_key IS NOT NULL AND department='' ORDER BY id"):
+                        _triage_jobs.put((site, pid, None))
+                except sqlite3.OperationalError:
+                    pass
+        threading.Thread(target=_triage_worker, name='triage', daemon=True).start()
+
+BATCH_FIELDS = ('name','age','mobile','symptoms','days','language')
+
+def _clean_registration(it):
+    """(key, fields) for one batch item, or (key, error) when it can never
+    be saved — bad items are rejected alone so the outbox still drains."""
+    if not isinstance(it, dict): return None, 'registration must be an object'
+    key = it.get('idempotency_key')
+    key = str(key).strip() if isinstance(key, (str, int)) and not isinstance(key, bool) else ''
+    if not key: return None, 'missing idempotency_key'
+    data = {}
+    for f in BATCH_FIELDS:
+        v = it.get(f)
+        if v is None: v = ''
+        elif isinstance(v, (int, float)) and not isinstance(v, bool): v = str(v)
+        elif not isinstance(v, str): return key, f'{f} must be a string'
+        data[f] = v
+    if not isinstance(it.get('emergency', False), (bool, int, type(None))):
+        return key, 'emergency must be a boolean'
+    data['emergency'] = bool(it.get('emergency'))
+    data['language']  = data['language'] or 'English'
+    return key, data
+
+@app.route('/process/batch', methods=['POST'])
+@with_site()
+def process_batch(site):
+    """Register many patients at once.
+    Body: {"registrations":[{"idempotency_key":..., <same fields as /process>}, ...]}
+    Returns one result per item, in order. Replayed keys return the stored
+    registration with "duplicate": true; malformed items get
+    {"idempotency_key", "status": 400, "error"} and are not saved."""
+    body  = request.json or {}
+    items = body.get('registrations')
+    if not isinstance(items, list) or not items:
+        return jsonify({'error':'registrations must be a non-empty list'}),400
+    if len(items) > BATCH_MAX:
+        return jsonify({'error':f'at most {BATCH_MAX} registrations per batch'}),413
+    cleaned = [_clean_registration(it) for it in items]
+
+    start_triage_worker()
+    created, results = [], []
+    with site.db() as conn:
+        c = conn.cursor()
+        try:
+            c.execute("BEGIN IMMEDIATE")
+            token = get_next_token(c)
+            for key, it in cleaned:
+                if isinstance(it, str):
+                    results.append({'idempotency_key':key,'status':400,'error':it})
+                    continue
+                c.execute("SELECT * FROM patients WHERE client_key=?",(key,))
+                existing = c.fetchone()
+                if existing:
+                    results.append(dict(_batch_result(existing), duplicate=True))
+                    continue
+                emergency = it['emergency'] or site.is_emergency(it['symptoms'])
+                data = dict(it, emergency=emergency, priority='High' if emergency else 'Normal',
+                            department='', floor=None, floorWord='')
+                if emergency:
+                    em = site.depts['Emergency']   # no LLM needed — route straight to Emergency
+                    data.update(department='Emergency',floor=em['floor'],floorWord=em['fw'],doctor=em['doctor'])
+                pid = insert_patient(c, data, new_registration_number(), token, key)
+                token += 1
+                c.execute("SELECT * FROM patients WHERE id=?",(pid,))
+                row = c.fetchone()
+                created.append(dict(row))
+                results.append(dict(_batch_result(row), duplicate=False))
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            print(f"[BATCH ERR] {e}")
+            return jsonify({'error':'batch rejected, nothing was saved'}),500
+
+    for row in created:
+        if row['department']: site.sched.enqueue(row)
+        _triage_jobs.put((site, row['id'], TRACE.handoff()))
+    rejected = sum(1 for r in results if r.get('status') == 400)
+    return jsonify({'results':results,'created':len(created),'rejected':rejected,
+                    'duplicates':len(results)-len(created)-rejected})
+
+@app.route('/process/batch', methods=['GET'])
+@with_site()
+def process_batch_status(site):
+    """Look up registrations by idempotency key: ?keys=k1,k2 — lets a kiosk
+    fetch the department once background triage has finished."""
+    keys = [k for k in request.args.get('keys','').split(',') if k][:BATCH_MAX]
+    if not keys: return jsonify({'results':[]})
+    with site.db() as conn:
+        rows = conn.execute(f"SELECT * FROM patients WHERE client_key IN ({','.join('?'*len(keys))})",keys).fetchall()
+    found = {r['client_key']:_batch_result(r) for r in rows}
+    return jsonify({'results':[found.get(k, {'idempotency_key':k,'triage':'unknown'}) for k in keys]})
+
 # ─────────────────────────────
 #  VIEW PATIENTS
 # ─────────────────────────────
 @app.route('/patients', methods=['GET'])
-def get_patients():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    c.execute("SELECT * FROM patients ORDER BY id DESC LIMIT 100")
-    rows = [dict(r) for r in c.fetchall()]
-    conn.close()
+@with_site(admin=True)
+def get_patients(site):
+    with site.db() as conn:
+        rows = [dict(r) for r in conn.execute("SELECT * FROM patients ORDER BY id DESC LIMIT 100")]
     return jsonify(rows)
 
 # ─────────────────────────────
 #  ADMIN DASHBOARD ROUTES
+#  The admin password identifies the site: each hospital has its own.
 # ─────────────────────────────
-ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD", "voicebyte2024")
-
-@app.route('/admin')
-def admin_page():
-    auth = request.args.get('key','')
-    if auth != ADMIN_PASSWORD:
-        wrong = request.args.get('key') is not None
-        return f'''<html><body style="font-family:sans-serif;display:flex;align-items:center;
+LOGIN_HTML = '''<html><body style="font-family:sans-serif;display:flex;align-items:center;
         justify-content:center;height:100vh;margin:0;background:#0F2137;">
         <div style="background:white;padding:40px;border-radius:16px;text-align:center;width:320px;box-shadow:0 20px 60px rgba(0,0,0,0.5);">
           <div style="font-size:48px">🏥</div>
@@ -719,90 +1240,138 @@ def admin_page():
               🔐 Login
             </button>
           </form>
-          {'<p style="color:red;font-size:13px;margin-top:10px;">❌ Wrong password. Try again.</p>' if wrong else ''}
-        </div></body></html>''', 401
-
-    # Find Admin.html — works both locally and on Render
-    base = os.path.dirname(os.path.abspath(__file__))
-    candidates = [
-        os.path.join(base, '..', 'frontend', 'Admin.html'),
-        os.path.join(base, 'frontend', 'Admin.html'),
-        os.path.join(base, '..', 'frontend', 'admin.html'),
-        os.path.join(base, 'Admin.html'),
-        os.path.join(base, 'admin.html'),
-    ]
-    for path in candidates:
-        if os.path.exists(path):
-            return send_from_directory(os.path.dirname(path), os.path.basename(path))
-    return "Admin page not found. Check Admin.html is in frontend folder.", 404
+          {error}
+        </div></body></html>'''
+LOGIN_PAGE       = StaticAsset(LOGIN_HTML.format(error=''), 'text/html', 'no-store')
+LOGIN_PAGE_WRONG = StaticAsset(LOGIN_HTML.format(
+    error='<p style="color:red;font-size:13px;margin-top:10px;">❌ Wrong password. Try again.</p>'), 'text/html', 'no-store')
+ADMIN_PAGE       = load_page('Admin.html', 'admin.html', cache_control='private, no-cache')
+
+@app.route('/admin')
+def admin_page():
+    site = SITES.for_admin_key(request.args.get('key','')) or _replayed_site()
+    if site is None:
+        wrong = request.args.get('key') is not None
+        return (LOGIN_PAGE_WRONG if wrong else LOGIN_PAGE).response(401)
+    TRACE.annotate(site=site.id)
+    if ADMIN_PAGE is None:
+        return "Admin page not found. Check Admin.html is in frontend folder.", 404
+    return ADMIN_PAGE.response()
 
 @app.route('/admin/queue')
-def admin_queue():
+@with_site(admin=True)
+def admin_queue(site):
+    """Today's patients in scheduling order: waiting (Emergency → High → Normal,
+    then token), then called, then seen. Waiting rows carry queue_position and
+    est_wait_min from the scheduler. Optional ?dept= narrows to one department."""
     today = datetime.now().strftime('%Y-%m-%d')
-    conn  = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    c.execute("SELECT * FROM patients WHERE DATE(visit_time)=? ORDER BY token_number ASC",(today,))
-    rows = [dict(r) for r in c.fetchall()]
-    conn.close()
+    dept  = request.args.get('dept')
+    with site.db() as conn:
+        if dept:
+            c = conn.execute("SELECT * FROM patients WHERE DATE(visit_time)=? AND department=? ORDER BY token_number ASC",(today,dept))
+        else:
+            c = conn.execute("SELECT * FROM patients WHERE DATE(visit_time)=? ORDER BY token_number ASC",(today,))
+        rows = [dict(r) for r in c.fetchall()]
+    slots = {q['id']:q for d in site.sched.snapshot(dept).values() for q in d['queue']}
+    status_order = {'waiting':0,'called':1,'seen':2}
+    for r in rows:
+        s = slots.get(r['id'])
+        r['queue_position'] = s['position'] if s else None
+        r['est_wait_min']   = s['est_wait_min'] if s else None
+    rows.sort(key=lambda r:(status_order.get(r.get('status'),3), queue_rank(r), r.get('token_number') or 0))
     return jsonify(rows)
 
+@app.route('/admin/queues')
+@with_site(admin=True)
+def admin_queues(site):
+    """Per-department queue depth, order and running wait estimates."""
+    return jsonify(site.sched.snapshot(request.args.get('dept')))
+
+def _set_called(site, pid):
+    now = datetime.now().strftime(TS_FMT)
+    with site.db() as conn:
+        conn.execute("UPDATE patients SET status='called', called_time=COALESCE(called_time,?) WHERE id=?",(now,pid))
+        conn.commit()
+        r = conn.execute("SELECT * FROM patients WHERE id=?",(pid,)).fetchone()
+    if r is None: return None
+    row = dict(r)
+    site.sched.mark_called(row, _parse_ts(row.get('called_time')))
+    send_sms(row.get('mobile',''),'called',row.get('token_number',0),row.get('department',''),row.get('floor_number',1),row.get('language','English'),site)
+    return row
+
 @app.route('/admin/call',methods=['POST'])
-def admin_call():
+@with_site(admin=True)
+def admin_call(site):
     """Mark patient as 'called' (being seen) and fire SMS."""
     pid = request.json.get('id')
     if not pid: return jsonify({'error':'missing id'}),400
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    c.execute("UPDATE patients SET status='called' WHERE id=?",(pid,))
-    conn.commit()
-    c.execute("SELECT * FROM patients WHERE id=?",(pid,))
-    row = dict(c.fetchone())
-    conn.close()
-    send_sms(row.get('mobile',''),'called',row.get('token_number',0),row.get('department',''),row.get('floor_number',1),row.get('language','English'))
+    if _set_called(site, pid) is None: return jsonify({'error':'not found'}),404
     return jsonify({'ok':True,'sms_sent':bool(FAST2SMS_KEY)})
 
+@app.route('/admin/call-next',methods=['POST'])
+@with_site(admin=True)
+def admin_call_next(site):
+    """Call the highest-priority waiting patient for a department or doctor."""
+    body   = request.json or {}
+    dept   = body.get('department')
+    doctor = body.get('doctor')
+    if dept == 'all': dept = None
+    pid = site.sched.next_for(dept, doctor)
+    if pid is None: return jsonify({'ok':False,'error':'no waiting patients'}),404
+    row = _set_called(site, pid)
+    if row is None: return jsonify({'ok':False,'error':'not found'}),404
+    return jsonify({'ok':True,'sms_sent':bool(FAST2SMS_KEY),'id':pid,
+                    'token_number':row.get('token_number'),'department':row.get('department'),
+                    'name':row.get('name'),'emergency':row.get('emergency')})
+
 @app.route('/admin/seen',methods=['POST'])
-def admin_seen():
+@with_site(admin=True)
+def admin_seen(site):
     """Mark patient as fully 'seen' (completed)."""
     pid = request.json.get('id')
     if not pid: return jsonify({'error':'missing id'}),400
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    c.execute("UPDATE patients SET status='seen' WHERE id=?",(pid,))
-    conn.commit()
-    c.execute("SELECT * FROM patients WHERE id=?",(pid,))
-    row = dict(c.fetchone())
-    conn.close()
+    now = datetime.now().strftime(TS_FMT)
+    with site.db() as conn:
+        conn.execute("UPDATE patients SET status='seen', seen_time=? WHERE id=?",(now,pid))
+        conn.commit()
+        r = conn.execute("SELECT * FROM patients WHERE id=?",(pid,)).fetchone()
+    if r is None: return jsonify({'error':'not found'}),404
+    site.sched.mark_seen(dict(r), _parse_ts(now))
     return jsonify({'ok':True})
 
 @app.route('/admin/stats')
-def admin_stats():
+@with_site(admin=True)
+def admin_stats(site):
     today = datetime.now().strftime('%Y-%m-%d')
-    conn  = sqlite3.connect(DB_PATH)
-    c     = conn.cursor()
-    c.execute("SELECT COUNT(*) FROM patients WHERE DATE(visit_time)=?",(today,))
-    total = c.fetchone()[0]
-    c.execute("SELECT COUNT(*) FROM patients WHERE DATE(visit_time)=? AND emergency=1",(today,))
-    emerg = c.fetchone()[0]
-    c.execute("SELECT COUNT(*) FROM patients WHERE DATE(visit_time)=? AND status='seen'",(today,))
-    seen  = c.fetchone()[0]
-    c.execute("SELECT COUNT(*) FROM patients WHERE DATE(visit_time)=? AND status='called'",(today,))
-    called= c.fetchone()[0]
-    c.execute("SELECT department,COUNT(*) as n FROM patients WHERE DATE(visit_time)=? GROUP BY department ORDER BY n DESC LIMIT 1",(today,))
-    r = c.fetchone()
+    with site.db() as conn:
+        c = conn.cursor()
+        c.execute("SELECT COUNT(*) FROM patients WHERE DATE(visit_time)=?",(today,))
+        total = c.fetchone()[0]
+        c.execute("SELECT COUNT(*) FROM patients WHERE DATE(visit_time)=? AND emergency=1",(today,))
+        emerg = c.fetchone()[0]
+        c.execute("SELECT COUNT(*) FROM patients WHERE DATE(visit_time)=? AND status='seen'",(today,))
+        seen  = c.fetchone()[0]
+        c.execute("SELECT COUNT(*) FROM patients WHERE DATE(visit_time)=? AND status='called'",(today,))
+        called= c.fetchone()[0]
+        c.execute("SELECT department,COUNT(*) as n FROM patients WHERE DATE(visit_time)=? GROUP BY department ORDER BY n DESC LIMIT 1",(today,))
+        r = c.fetchone()
     top  = r[0] if r else 'None'
-    conn.close()
-    return jsonify({'total':total,'emergencies':emerg,'seen':seen,'called':called,'waiting':total-seen-called,'top_dept':top})
+    return jsonify({'total':total,'emergencies':emerg,'seen':seen,'called':called,'waiting':total-seen-called,
+                    'top_dept':top,'site':site.id,'site_name':site.name})
 
 @app.route('/health')
 def health():
     return jsonify({'status':'VoiceByte OK'})
 
+@app.route('/admin/llm')
+@with_site(admin=True)
+def admin_llm(site):
+    """LLM scheduler queue depth, wait times and quota headroom (shared by all sites)."""
+    return jsonify(LLM.stats())
+
 if __name__ == '__main__':
     init_db()
+    start_triage_worker()   # resumes batch rows left untriaged by the last run
     print("✅ VoiceByte backend started!")
     print("🌐 Open Chrome → http://127.0.0.1:5000")
     print("")
@@ -0,0 +1,322 @@
+"""
+VoiceByte — LLM admission control
+Every Groq call goes through one scheduler so kiosks stop racing each
+other into the rate limit:
+  • a bounded pool of worker threads (max concurrent upstream calls)
+  • sliding-window limits for requests/minute and tokens/minute, counted
+    the way the upstream counts them (a full minute after idling can't
+    be spent twice)
+  • priority lanes — triage for a waiting patient beats interactive
+    extraction, which beats background work
+  • identical in-flight requests are coalesced into one upstream call
+  • retries re-enter the queue and pay the limits again, instead of
+    hammering a throttled upstream from inside the request
+  • a job whose every caller has timed out is dropped before it spends quota
+
+Run directly to simulate a fake upstream at the quota limit:
+    python llm_scheduler.py [seconds]
+(the rate window is scaled to a fifth of the run so it spans several windows)
+"""
+import collections, heapq, itertools, sys, threading, time
+from contextlib import nullcontext
+
+LANES = ('triage', 'interactive', 'background')   # highest priority first
+
+WINDOW       = 60.0   # Groq counts requests and tokens per minute
+WINDOW_SLACK = 0.02   # our window outlasts the upstream's by 2%: a request reaches it after we admit it
+
+class WindowLimit:
+    """At most `limit` units in any `window` seconds. Every admission is
+    logged and expires a full window later, so — unlike a token bucket
+    that starts full — a burst after idling can never exceed the limit."""
+
+    def __init__(self, limit, window=WINDOW, clock=time.monotonic):
+        self.limit  = float(limit)
+        self.window = window * (1 + WINDOW_SLACK)
+        self.clock  = clock
+        self.log    = collections.deque()   # [admitted_at, amount]
+        self.used   = 0.0
+
+    def _prune(self):
+        edge = self.clock() - self.window
+        while self.log and self.log[0][0] <= edge:
+            self.used -= self.log.popleft()[1]
+
+    @property
+    def available(self):
+        self._prune()
+        return self.limit - self.used
+
+    def wait_time(self, amount):
+        self._prune()
+        amount = min(amount, self.limit)   # an oversized job must still fit eventually
+        over   = self.used + amount - self.limit
+        if over <= 0: return 0.0
+        freed = 0.0
+        for at, n in self.log:
+            freed += n
+            if freed >= over: return at + self.window - self.clock()
+        return self.window
+
+    def take(self, amount):
+        """Log `amount` now; returns a handle for settle()."""
+        self._prune()
+        entry = [self.clock(), amount]
+        self.log.append(entry)
+        self.used += amount
+        return entry
+
+    def settle(self, entry, amount):
+        # Replace an estimate with the real usage while it still counts
+        self._prune()
+        if entry[0] > self.clock() - self.window:
+            self.used += amount - entry[1]
+            entry[1] = amount
+
+def estimate_tokens(system_prompt, user_msg, max_tok):
+    # ~4 characters per token plus the full completion budget
+    return (len(system_prompt) + len(user_msg)) // 4 + max_tok
+
+class _Job:
+    __slots__ = ('key', 'args', 'lane', 'seq', 'tokens', 'state', 'attempts', 'enqueued',
+                 'ready_at', 'done', 'result', 'error', 'waiters', 'contexts', 'charge')
+
+    def __init__(self, key, args, lane, seq, tokens, now):
+        self.key, self.args, self.lane, self.seq, self.tokens = key, args, lane, seq, tokens
+        self.state, self.attempts, self.enqueued, self.ready_at = 'queued', 0, now, now
+        self.done, self.result, self.error, self.waiters = threading.Event(), None, None, 1
+        self.contexts, self.charge = [], None
+
+class LLMScheduler:
+    """`call(system_prompt, user_msg, max_tok)` must return (text, tokens_used);
+    tokens_used may be None when the upstream does not report it.
+
+    `trace` (optional) has context() and bind(contexts): each submitter's
+    context is captured and the worker runs `call` bound to all of them,
+    so per-request tracing sees the upstream call, not the queueing."""
+
+    def __init__(self, call, concurrency=4, rpm=30, tpm=6000, retries=3, retry_delay=1.0,
+                 clock=time.monotonic, trace=None, window=WINDOW):
+        self.call        = call
+        self.trace       = trace
+        self.concurrency = concurrency
+        self.retries     = retries
+        self.retry_delay = retry_delay
+        self.clock       = clock
+        self.rpm         = WindowLimit(rpm, window, clock)
+        self.tpm         = WindowLimit(tpm, window, clock)
+        self.cond        = threading.Condition()
+        self.heap        = []     # (lane index, seq, job) — stale entries skipped lazily
+        self.delayed     = []     # jobs waiting out a retry back-off
+        self.inflight    = {}     # key -> job, queued or running
+        self.seq         = itertools.count()
+        self.running     = 0
+        self.started     = False
+        self.counters    = {'submitted':0,'coalesced':0,'completed':0,'failed':0,'retries':0,
+                            'cancelled':0,'tokens':0}
+        self.wait_avg    = {lane: 0.0 for lane in LANES}
+        self.wait_max    = {lane: 0.0 for lane in LANES}
+        self.served      = {lane: 0 for lane in LANES}
+
+    # ── public ──
+    def submit(self, system_prompt, user_msg, max_tok=150, lane='interactive', timeout=None):
+        """Run (or join) an LLM call and block for its text. Raises the
+        upstream's last error, or TimeoutError if `timeout` runs out first."""
+        lane_idx = LANES.index(lane)
+        key      = (system_prompt, user_msg, max_tok)
+        ctx      = self.trace.context() if self.trace else None
+        with self.cond:
+            self._start()
+            self.counters['submitted'] += 1
+            job = self.inflight.get(key)
+            if job is not None:
+                self.counters['coalesced'] += 1
+                job.waiters += 1
+                job.contexts.append(ctx)
+                if lane_idx < job.lane and job.state == 'queued':
+                    job.lane = lane_idx           # promote; the old heap entry goes stale
+                    if job not in self.delayed:   # delayed jobs re-enter with their new lane
+                        heapq.heappush(self.heap, (lane_idx, job.seq, job))
+                    self.cond.notify()
+            else:
+                job = _Job(key, key, lane_idx, next(self.seq),
+                           estimate_tokens(system_prompt, user_msg, max_tok), self.clock())
+                job.contexts.append(ctx)
+                self.inflight[key] = job
+                heapq.heappush(self.heap, (lane_idx, job.seq, job))
+                self.cond.notify()
+        if not job.done.wait(timeout):
+            with self.cond:
+                if job.state != 'done':
+                    self._abandon(job)
+                    raise TimeoutError(f"LLM request still queued/running after {timeout}s")
+        if job.error is not None:
+            raise job.error
+        return job.result
+
+    def stats(self):
+        with self.cond:
+            depth = {lane: 0 for lane in LANES}
+            for idx, _, job in self.heap:
+                if self._live(idx, job): depth[LANES[idx]] += 1
+            for job in self.delayed: depth[LANES[job.lane]] += 1
+            return {
+                'queue_depth': depth,
+                'running': self.running,
+                'concurrency': self.concurrency,
+                'wait_avg_ms': {l: round(v * 1000) for l, v in self.wait_avg.items()},
+                'wait_max_ms': {l: round(v * 1000) for l, v in self.wait_max.items()},
+                'served': dict(self.served),
+                'rpm_available': round(max(self.rpm.available, 0), 1),
+                'tpm_available': round(max(self.tpm.available, 0)),
+                **self.counters,
+            }
+
+    # ── internals ──
+    def _start(self):
+        if self.started: return
+        self.started = True
+        for i in range(self.concurrency):
+            threading.Thread(target=self._worker, name=f'llm-{i}', daemon=True).start()
+
+    def _abandon(self, job):
+        # Caller holds self.cond. The last caller giving up cancels a job that
+        # has not started, so it never spends quota; a running one finishes.
+        job.waiters -= 1
+        if job.waiters > 0 or job.state != 'queued': return
+        job.state = 'cancelled'               # its heap entry is now stale
+        if job in self.delayed: self.delayed.remove(job)
+        if self.inflight.get(job.key) is job: del self.inflight[job.key]
+        self.counters['cancelled'] += 1
+
+    @staticmethod
+    def _live(idx, job):
+        return job.state == 'queued' and job.lane == idx
+
+    def _next_job(self):
+        # Caller holds self.cond. Strict priority: only the best ready job may
+        # take quota, so background work never jumps ahead of triage.
+        while True:
+            now = self.clock()
+            for job in [j for j in self.delayed if j.ready_at <= now]:
+                self.delayed.remove(job)
+                heapq.heappush(self.heap, (job.lane, job.seq, job))
+            while self.heap and not self._live(self.heap[0][0], self.heap[0][2]):
+                heapq.heappop(self.heap)
+            wait = None
+            if self.heap:
+                job  = self.heap[0][2]
+                wait = max(self.rpm.wait_time(1), self.tpm.wait_time(job.tokens))
+                if wait <= 0:
+                    heapq.heappop(self.heap)
+                    self.rpm.take(1)
+                    job.charge = self.tpm.take(job.tokens)
+                    job.state = 'running'
+                    return job
+            if self.delayed:
+                soonest = min(j.ready_at for j in self.delayed) - now
+                wait = soonest if wait is None else min(wait, soonest)
+            self.cond.wait(None if wait is None else max(wait, 0.001))
+
+    def _worker(self):
+        while True:
+            with self.cond:
+                job = self._next_job()
+                self.running += 1
+                if job.attempts == 0:
+                    waited = self.clock() - job.enqueued
+                    lane   = LANES[job.lane]
+                    self.wait_avg[lane] = 0.2 * waited + 0.8 * self.wait_avg[lane]
+                    self.wait_max[lane] = max(self.wait_max[lane], waited)
+                    self.served[lane] += 1
+            job.attempts += 1
+            try:
+                with self.trace.bind(job.contexts) if self.trace else nullcontext():
+                    text, used = self.call(*job.args)
+            except Exception as e:
+                print(f"[LLM attempt {job.attempts} failed]: {e}")
+                with self.cond:
+                    self.running -= 1
+                    if job.attempts < self.retries:
+                        self.counters['retries'] += 1
+                        job.state, job.ready_at = 'queued', self.clock() + self.retry_delay * job.attempts
+                        self.delayed.append(job)
+                    else:
+                        print(f"[LLM all retries failed]: {e}")
+                        self.counters['failed'] += 1
+                        self._finish(job, error=e)
+                    self.cond.notify_all()
+                continue
+            with self.cond:
+                self.running -= 1
+                if used is not None:
+                    self.tpm.settle(job.charge, used)   # reconcile the estimate
+                self.counters['tokens'] += used if used is not None else job.tokens
+                self.counters['completed'] += 1
+                self._finish(job, result=text)
+                self.cond.notify_all()
+
+    def _finish(self, job, result=None, error=None):
+        job.state, job.result, job.error = 'done', result, error
+        self.inflight.pop(job.key, None)
+        job.done.set()
+
+# ─────────────────────────────
+#  FAKE-UPSTREAM SIMULATION
+# ─────────────────────────────
+def simulate(seconds=20, rpm=120, tpm=24000, concurrency=4, clients=24, overload=1.5,
+             window=WINDOW, make=None):
+    """Offer `overload` × the quota, spread evenly over the three lanes,
+    against a fake upstream that fails any call over its per-window limit,
+    and report sustained throughput versus the quota. `make(call, rpm=,
+    tpm=, window=)` builds the scheduler under test (default: a fresh
+    LLMScheduler). Returns the scheduler stats plus 'rate' (completed per
+    window) and 'rejected' (upstream 429s)."""
+    lock, calls, rejected = threading.Lock(), [], [0]
+
+    def fake_upstream(system_prompt, user_msg, max_tok):
+        now = time.monotonic()
+        with lock:
+            recent = [t for t in calls if now - t < window]
+            if len(recent) >= rpm:            # a real upstream would answer 429
+                rejected[0] += 1
+                raise RuntimeError('429 rate limited')
+            calls.append(now)
+        time.sleep(0.05)                      # upstream latency
+        return 'ok', estimate_tokens(system_prompt, user_msg, max_tok)
+
+    make  = make or (lambda call, **kw: LLMScheduler(call, concurrency=concurrency, **kw))
+    sched = make(fake_upstream, rpm=rpm, tpm=tpm, window=window)
+    stop  = time.monotonic() + seconds
+    seqs  = itertools.count()
+    every = clients * window / (rpm * overload)   # seconds between one client's requests
+
+    def client(i):
+        lane = LANES[i % len(LANES)]
+        time.sleep(every * i / clients)
+        while time.monotonic() < stop:
+            nxt = time.monotonic() + every
+            seq = next(seqs)
+            # every 4th request repeats an earlier prompt and can be coalesced
+            msg = f'patient {seq - seq % 4 if seq % 4 == 3 else seq}'
+            try: sched.submit('You are a triage doctor.', msg, 20, lane=lane, timeout=seconds)
+            except Exception: pass
+            time.sleep(max(0.0, nxt - time.monotonic()))
+
+    start = time.monotonic()
+    for i in range(clients):
+        threading.Thread(target=client, args=(i,), daemon=True).start()
+    time.sleep(max(0.0, stop - time.monotonic()))
+    elapsed = time.monotonic() - start       # stragglers still queued are left behind
+    s = sched.stats()
+    rate = s['completed'] / elapsed * window
+    print(f"quota {rpm} req/{window:g}s · offered {overload:.1f}× quota from {clients} clients · {elapsed:.1f}s")
+    print(f"completed {s['completed']}  →  {rate:.1f} req/{window:g}s ({rate / rpm:.0%} of quota)")
+    print(f"upstream 429s {rejected[0]} · coalesced {s['coalesced']} · retries {s['retries']}")
+    for l in LANES:
+        print(f"  {l:<12} served {s['served'][l]:>4} · avg wait {s['wait_avg_ms'][l]:>6} ms · queued {s['queue_depth'][l]}")
+    return dict(s, rate=rate, rejected=rejected[0])
+
+if __name__ == '__main__':
+    secs = float(sys.argv[1]) if len(sys.argv) > 1 else 20
+    simulate(secs, rpm=40, tpm=8000, window=secs / 5)
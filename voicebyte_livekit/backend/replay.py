@@ -0,0 +1,133 @@
+"""
+VoiceByte — deterministic trace replay for performance regression testing
+
+1. Capture real traffic (opt-in):
+       VOICEBYTE_TRACE_DIR=traces python backend/app.py
+2. Start the build under test in replay mode, from an empty working
+   directory so it gets a fresh voicebyte.db and patient ids line up:
+       VOICEBYTE_REPLAY=/path/trace.jsonl python /path/backend/app.py
+3. Drive it and save a latency report:
+       python replay.py run trace.jsonl --speed 10 --out build-a.json
+4. Compare two builds:
+       python replay.py diff build-a.json build-b.json
+
+--speed 1 keeps the recorded arrival gaps, 10 plays them ten times faster
+(recorded upstream latency shrinks by the same factor), 0 sends every
+request as fast as --workers allows.
+"""
+import argparse, json, sys, threading, time, urllib.error, urllib.parse, urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from traces import KIOSK_HEADER, REPLAY_HEADER, SITE_HEADER, SPEED_HEADER
+
+PCTS = (50, 90, 95, 99)
+
+def load_trace(path):
+    with open(path, encoding='utf-8') as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    return sorted(entries, key=lambda e: e['t'])
+
+def percentile(sorted_vals, p):
+    if not sorted_vals: return 0.0
+    k = (len(sorted_vals) - 1) * p / 100
+    lo, hi = int(k), min(int(k) + 1, len(sorted_vals) - 1)
+    return sorted_vals[lo] + (sorted_vals[hi] - sorted_vals[lo]) * (k - lo)
+
+def send(target, entry, speed):
+    query = urllib.parse.urlencode({k: v for k, v in (entry.get('query') or {}).items() if k != 'key'})
+    url   = target + entry['path'] + ('?' + query if query else '')
+    data  = json.dumps(entry['body']).encode() if entry.get('body') is not None else None
+    headers = {'Content-Type': 'application/json', REPLAY_HEADER: entry['id'],
+               SPEED_HEADER: str(speed or 1000)}
+    # Multi-site builds route by site / kiosk; admin routes accept the site in replay mode
+    if entry.get('site'):  headers[SITE_HEADER]  = entry['site']
+    if entry.get('kiosk'): headers[KIOSK_HEADER] = entry['kiosk']
+    req   = urllib.request.Request(url, data=data, method=entry['method'], headers=headers)
+    t0 = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=120) as res:
+            res.read(); status = res.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except Exception:
+        status = 0
+    return (time.perf_counter() - t0) * 1000, status
+
+def run(trace, target, speed, workers):
+    entries = load_trace(trace)
+    results, lock = {}, threading.Lock()
+    mismatched = [0]
+
+    def one(entry):
+        ms, status = send(target, entry, speed)
+        with lock:
+            results.setdefault(entry['endpoint'], []).append(ms)
+            if status != entry.get('status'): mismatched[0] += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        t_first = entries[0]['t'] if entries else 0
+        for entry in entries:
+            if speed:
+                due = start + (entry['t'] - t_first) / speed
+                time.sleep(max(0.0, due - time.perf_counter()))
+            pool.submit(one, entry)
+    wall = time.perf_counter() - start
+
+    report = {'trace': trace, 'target': target, 'speed': speed, 'requests': len(entries),
+              'wall_s': round(wall, 2), 'status_mismatches': mismatched[0], 'endpoints': {}}
+    for ep, vals in sorted(results.items()):
+        vals.sort()
+        report['endpoints'][ep] = {'n': len(vals), **{f'p{p}': round(percentile(vals, p), 2) for p in PCTS}}
+    return report
+
+def print_report(report):
+    print(f"{report['requests']} requests in {report['wall_s']}s · speed {report['speed'] or 'max'}"
+          f" · status mismatches {report['status_mismatches']}")
+    print(f"{'endpoint':<28}{'n':>6}" + ''.join(f"{'p%d ms' % p:>10}" for p in PCTS))
+    for ep, s in report['endpoints'].items():
+        print(f"{ep:<28}{s['n']:>6}" + ''.join(f"{s['p%d' % p]:>10.1f}" for p in PCTS))
+
+def diff(base_path, new_path, threshold):
+    with open(base_path) as f: base = json.load(f)
+    with open(new_path) as f: new  = json.load(f)
+    print(f"{'endpoint':<28}" + ''.join(f"{'p%d Δ' % p:>16}" for p in PCTS))
+    regressed = False
+    for ep in sorted(set(base['endpoints']) | set(new['endpoints'])):
+        a, b = base['endpoints'].get(ep), new['endpoints'].get(ep)
+        if not a or not b:
+            print(f"{ep:<28}  only in {'new' if b else 'base'}"); continue
+        cells = []
+        for p in PCTS:
+            k = f'p{p}'
+            pct = (b[k] - a[k]) / a[k] * 100 if a[k] else 0.0
+            mark = ' !' if pct > threshold else '  '
+            regressed |= pct > threshold and p in (50, 95)
+            cells.append(f"{b[k] - a[k]:>+8.1f}ms{pct:>+5.0f}%{mark}")
+        print(f"{ep:<28}" + ''.join(f"{c:>16}" for c in cells))
+    return regressed
+
+def main(argv=None):
+    ap  = argparse.ArgumentParser(description='Replay VoiceByte request traces.')
+    sub = ap.add_subparsers(dest='cmd', required=True)
+    r = sub.add_parser('run', help='replay a trace against a running instance')
+    r.add_argument('trace')
+    r.add_argument('--target', default='http://127.0.0.1:5000')
+    r.add_argument('--speed', type=float, default=1.0, help='1 = real time, 0 = as fast as possible')
+    r.add_argument('--workers', type=int, default=32)
+    r.add_argument('--out', help='write the JSON report here')
+    d = sub.add_parser('diff', help='compare two run reports')
+    d.add_argument('base'); d.add_argument('new')
+    d.add_argument('--threshold', type=float, default=10.0, help='%% slowdown flagged as a regression')
+    args = ap.parse_args(argv)
+
+    if args.cmd == 'run':
+        report = run(args.trace, args.target.rstrip('/'), args.speed, args.workers)
+        print_report(report)
+        if args.out:
+            with open(args.out, 'w') as f: json.dump(report, f, indent=2)
+        return 0
+    return 1 if diff(args.base, args.new, args.threshold) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""
+VoiceByte — multi-site (multi-hospital) configuration
+With no config files the app runs one built-in site exactly as before.
+Drop one JSON file per hospital into backend/sites/ (or VOICEBYTE_SITES_DIR)
+and those sites replace it; see sites/example-site.json.example.
+
+Every site has its own SQLite file, connection pool, department catalog,
+emergency vocabulary, SMS templates and admin password, so one site's
+requests never open another site's database.
+"""
+import glob, json, os, queue, re, sqlite3
+from contextlib import contextmanager
+
+REQUIRED_DEPTS = ('Emergency', 'General Medicine')   # triage fallbacks rely on both
+
+class ConnectionPool:
+    """Keeps up to `size` idle SQLite connections for one database file."""
+
+    def __init__(self, path, size=4):
+        self.path = path
+        self.size = size
+        self.idle = queue.LifoQueue()
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @contextmanager
+    def connection(self):
+        try:
+            conn = self.idle.get_nowait()
+        except queue.Empty:
+            conn = self._open()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction: conn.rollback()   # never hand back a half-done transaction
+            if self.idle.qsize() < self.size: self.idle.put(conn)
+            else: conn.close()
+
+class Site:
+    def __init__(self, site_id, name, depts, em_words, sms_tpl, db_path,
+                 admin_password='', kiosks=(), pool_size=4):
+        missing = [d for d in REQUIRED_DEPTS if d not in depts]
+        if missing:
+            raise ValueError(f"site '{site_id}': departments must include {', '.join(missing)}")
+        self.id             = site_id
+        self.name           = name
+        self.depts          = depts
+        self.em_words       = list(em_words)
+        self.sms_tpl        = sms_tpl
+        self.db_path        = db_path
+        self.admin_password = admin_password
+        self.kiosks         = set(kiosks)
+        self.pool           = ConnectionPool(db_path, pool_size)
+        # Keyword indexes compiled once per site, not per request
+        self.em_re       = re.compile('|'.join(re.escape(w) for w in sorted(self.em_words, key=len, reverse=True))) \
+                           if self.em_words else None
+        self.dept_words  = [(d, tuple((w, len(w.split())) for w in info.get('words', [])))
+                            for d, info in depts.items() if d != 'Emergency']
+        self.doctor_dept = {info['doctor']: d for d, info in depts.items()}
+
+    def db(self):
+        return self.pool.connection()
+
+    def is_emergency(self, text):
+        return bool(self.em_re and self.em_re.search(text.lower()))
+
+    def keyword_dept(self, text):
+        """Best department by keyword score, or None when nothing matches."""
+        lower  = text.lower()
+        scores = {}
+        for dept, words in self.dept_words:
+            score = sum(n for w, n in words if w in lower)
+            if score > 0: scores[dept] = score
+        return max(scores, key=scores.get) if scores else None
+
+    def dept_entry(self, name):
+        info = self.depts[name]
+        return {'name':name,'floor':info['floor'],'fw':info['fw'],'doctor':info['doctor'],
+                'color':info.get('color','#1252A3')}
+
+def _site_from_file(path, defaults):
+    with open(path, encoding='utf-8') as f:
+        cfg = json.load(f)
+    site_id = cfg.get('id') or os.path.splitext(os.path.basename(path))[0]
+    password = os.getenv(cfg['admin_password_env'], '') if cfg.get('admin_password_env') \
+               else cfg.get('admin_password', '')
+    if not password:
+        print(f"[SITES] warning: site '{site_id}' has no admin password — its dashboard is locked")
+    # Missing languages/message types fall back to the built-in templates
+    sms = {k: dict(v) for k, v in defaults['sms_tpl'].items()}
+    for mtype, langs in cfg.get('sms_templates', {}).items():
+        sms.setdefault(mtype, {}).update(langs)
+    return Site(
+        site_id, cfg.get('name', site_id), cfg['departments'],
+        cfg.get('emergency_words', defaults['em_words']), sms,
+        cfg.get('db_path') or f"voicebyte-{site_id}.db",
+        password, cfg.get('kiosks', ()), cfg.get('pool_size', 4))
+
+class SiteRegistry:
+    """All configured sites plus the lookups routes use to pick one."""
+
+    def __init__(self, sites, single):
+        self.sites    = {s.id: s for s in sites}
+        self.single   = single           # built-in site only → every kiosk resolves to it
+        self.by_kiosk = {k: s for s in sites for k in s.kiosks}
+
+    def __iter__(self):
+        return iter(self.sites.values())
+
+    def get(self, site_id):
+        return self.sites.get(site_id)
+
+    def for_admin_key(self, key):
+        """The site whose admin password is `key` — the only way admin
+        routes pick a site, in single- and multi-site mode alike."""
+        if not key: return None
+        return next((s for s in self.sites.values() if s.admin_password and s.admin_password == key), None)
+
+    def resolve(self, kiosk_id=None, site_id=None):
+        """Kiosk routes: kiosk id beats an explicit site id. Returns None
+        when nothing matches in multi-site mode, so callers can refuse
+        rather than guess another hospital."""
+        if self.single:
+            return next(iter(self.sites.values()))
+        return self.by_kiosk.get(kiosk_id) or self.sites.get(site_id)
+
+def load_sites(sites_dir, default_site):
+    """Load every *.json in `sites_dir`; fall back to `default_site` alone."""
+    files = sorted(glob.glob(os.path.join(sites_dir, '*.json'))) if sites_dir else []
+    if not files:
+        return SiteRegistry([default_site], single=True)
+    defaults = {'sms_tpl': default_site.sms_tpl, 'em_words': default_site.em_words}
+    sites = [_site_from_file(p, defaults) for p in files]
+    ids   = [s.id for s in sites]
+    if len(set(ids)) != len(ids):
+        raise ValueError(f"duplicate site ids in {sites_dir}: {ids}")
+    if len({os.path.abspath(s.db_path) for s in sites}) != len(sites):
+        raise ValueError("every site needs its own db_path")
+    # The password is what picks the site on admin routes — a shared one hides a dashboard
+    passwords = [s.admin_password for s in sites if s.admin_password]
+    if len(set(passwords)) != len(passwords):
+        raise ValueError("every site needs its own admin password")
+    print(f"[SITES] {len(sites)} sites: {', '.join(ids)}")
+    return SiteRegistry(sites, single=False)
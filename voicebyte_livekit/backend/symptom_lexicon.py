@@ -0,0 +1,326 @@
+"""
+VoiceByte — local symptom lexicon
+Turns common spoken complaints ("tala noppi", "pet me dard", "தலைவலி")
+into the same comma-separated English terms the Groq prompt returns,
+without a network round trip. /extract only falls back to Groq when a
+transcript has words this lexicon cannot place.
+
+Run directly for a coverage / latency report:
+    python symptom_lexicon.py corpus.txt
+Corpus format: one transcript per line, optionally "Language<TAB>transcript".
+"""
+import re, sys, time
+
+# ── Body parts → English (romanised + native script) ─────────────────────────
+BODY = {
+    'English': {
+        'head':'head','chest':'chest','heart':'chest','stomach':'stomach','belly':'stomach',
+        'abdomen':'stomach','tummy':'stomach','leg':'leg','legs':'leg','hand':'hand','hands':'hand',
+        'arm':'arm','arms':'arm','back':'back','knee':'knee','knees':'knee','neck':'neck',
+        'shoulder':'shoulder','throat':'throat','ear':'ear','eye':'eye','eyes':'eye',
+        'tooth':'tooth','teeth':'tooth','foot':'foot','feet':'foot','hip':'hip','joint':'joint',
+        'joints':'joint','body':'body',
+    },
+    'Telugu': {
+        'tala':'head','thala':'head','gunde':'chest','chaati':'chest','kadupu':'stomach','potta':'stomach',
+        'kalu':'leg','kaalu':'leg','kaallu':'leg','kai':'hand','cheyi':'hand','chetulu':'hand',
+        'veepu':'back','nadumu':'back','muru':'knee','mokalu':'knee','mokallu':'knee','meda':'neck',
+        'melu':'neck','bhujam':'shoulder','gonthu':'throat','gontu':'throat','chevi':'ear','kannu':'eye','kallu':'eye',
+        'pannu':'tooth','odalu':'body','ollu':'body',
+        'తల':'head','గుండె':'chest','ఛాతీ':'chest','కడుపు':'stomach','కాలు':'leg','కాళ్ళు':'leg',
+        'చేయి':'hand','చెయ్యి':'hand','వీపు':'back','నడుము':'back','మోకాలు':'knee','మెడ':'neck',
+        'గొంతు':'throat','చెవి':'ear','కన్ను':'eye','పన్ను':'tooth','ఒళ్ళు':'body',
+    },
+    'Hindi': {
+        'sar':'head','sir':'head','seena':'chest','seene':'chest','chhati':'chest','chati':'chest',
+        'pet':'stomach','pait':'stomach','pair':'leg','pairon':'leg','taang':'leg','haath':'hand',
+        'hath':'hand','kamar':'back','peeth':'back','ghutna':'knee','ghutne':'knee','gardan':'neck',
+        'kandha':'shoulder','kandhe':'shoulder','gala':'throat','gale':'throat','kaan':'ear',
+        'aankh':'eye','aankhon':'eye','daant':'tooth','badan':'body','sharir':'body','jodon':'joint',
+        'सिर':'head','सीना':'chest','सीने':'chest','छाती':'chest','पेट':'stomach','पैर':'leg',
+        'पैरों':'leg','हाथ':'hand','कमर':'back','पीठ':'back','घुटना':'knee','घुटने':'knee',
+        'गर्दन':'neck','कंधे':'shoulder','गला':'throat','गले':'throat','कान':'ear','आंख':'eye',
+        'दांत':'tooth','बदन':'body','जोड़ों':'joint',
+    },
+    'Tamil': {
+        'thalai':'head','talai':'head','nenju':'chest','nenja':'chest','vayiru':'stomach','vayaru':'stomach',
+        'kaal':'leg','kaalu':'leg','kai':'hand','muppu':'back','mudhugu':'back','muthugu':'back',
+        'muzhangaal':'knee','kazhuthu':'neck','tholpattai':'shoulder','thondai':'throat','kaadhu':'ear',
+        'kan':'eye','pal':'tooth','udambu':'body','udal':'body',
+        'தலை':'head','நெஞ்சு':'chest','வயிறு':'stomach','வயிற்று':'stomach','கால்':'leg','கை':'hand',
+        'முதுகு':'back','முழங்கால்':'knee','கழுத்து':'neck','தொண்டை':'throat','காது':'ear',
+        'கண்':'eye','பல்':'tooth','உடம்பு':'body','உடல்':'body',
+    },
+    'Malayalam': {
+        'thala':'head','tala':'head','maarbu':'chest','nenju':'chest','vayaru':'stomach','vayar':'stomach',
+        'kaal':'leg','kaalu':'leg','kai':'hand','puram':'back','nadu':'back','muttu':'knee',
+        'kazhuthu':'neck','tholu':'shoulder','thonda':'throat','thondai':'throat','chevi':'ear',
+        'kannu':'eye','pallu':'tooth','shareeram':'body',
+        'തല':'head','നെഞ്ച്':'chest','മാറ്':'chest','വയറ്':'stomach','വയറു':'stomach','കാൽ':'leg',
+        'കാല്':'leg','കൈ':'hand','പുറം':'back','നടു':'back','മുട്ട്':'knee','കഴുത്ത്':'neck',
+        'തോള്':'shoulder','തൊണ്ട':'throat','ചെവി':'ear','കണ്ണ്':'eye','പല്ല്':'tooth','ശരീരം':'body',
+    },
+}
+
+# ── Pain words — combine with a body part into "<part> pain" ─────────────────
+PAIN = {
+    'English':   {'pain','ache','aching','paining','hurts','hurting','sore'},
+    'Telugu':    {'noppi','noppiga','nopi','నొప్పి','నొప్పిగా'},
+    'Hindi':     {'dard','dukh','dukhta','dukhti','दर्द'},
+    'Tamil':     {'vali','valikuthu','valikudhu','வலி','வலிக்குது'},
+    'Malayalam': {'veda','vedana','novu','vedhana','വേദന','നോവ്'},
+}
+
+# ── Stand-alone symptoms → English medical term ─────────────────────────────
+SYMPTOMS = {
+    'English': {
+        'fever':'fever','cough':'cough','coughing':'cough','cold':'cold','vomiting':'vomiting',
+        'vomit':'vomiting','vomits':'vomiting','nausea':'nausea','headache':'headache',
+        'stomachache':'stomach pain','diarrhea':'diarrhea','diarrhoea':'diarrhea','loose motions':'diarrhea',
+        'motions':'diarrhea','dizziness':'dizziness','dizzy':'dizziness','giddiness':'dizziness',
+        'weakness':'weakness','tired':'fatigue','fatigue':'fatigue','rash':'skin rash','itching':'itching',
+        'swelling':'swelling','breathlessness':'breathlessness','constipation':'constipation',
+        'acidity':'acidity','gas':'gas','palpitation':'palpitation','palpitations':'palpitation',
+        'sneezing':'cold','runny nose':'cold','migraine':'migraine','bp':'blood pressure',
+        'sugar':'diabetes','diabetes':'diabetes',
+    },
+    'Telugu': {
+        'jwaram':'fever','jvaram':'fever','jwara':'fever','daggu':'cough','daggulu':'cough',
+        'jalubu':'cold','vanthi':'vomiting','vanthulu':'vomiting','vantulu':'vomiting',
+        'virochanalu':'diarrhea','kallu tirugudu':'dizziness','tala tirugudu':'dizziness',
+        'neerasam':'weakness','neerasanga':'weakness','duradalu':'itching','vapu':'swelling',
+        'ayasam':'breathlessness','gas':'gas','acidity':'acidity','sugar':'diabetes',
+        'జ్వరం':'fever','దగ్గు':'cough','జలుబు':'cold','వాంతి':'vomiting','వాంతులు':'vomiting',
+        'విరోచనాలు':'diarrhea','నీరసం':'weakness','దురద':'itching','వాపు':'swelling','ఆయాసం':'breathlessness',
+    },
+    'Hindi': {
+        'bukhar':'fever','bukhaar':'fever','khansi':'cough','khaansi':'cough','zukam':'cold',
+        'jukam':'cold','sardi':'cold','ulti':'vomiting','ultiyan':'vomiting','dast':'diarrhea',
+        'chakkar':'dizziness','kamzori':'weakness','thakan':'fatigue','khujli':'itching',
+        'sujan':'swelling','soojan':'swelling','saans phoolna':'breathlessness','gas':'gas',
+        'acidity':'acidity','sugar':'diabetes','ji machlana':'nausea',
+        'बुखार':'fever','खांसी':'cough','खाँसी':'cough','जुकाम':'cold','सर्दी':'cold','उल्टी':'vomiting',
+        'दस्त':'diarrhea','चक्कर':'dizziness','कमजोरी':'weakness','कमज़ोरी':'weakness','थकान':'fatigue',
+        'खुजली':'itching','सूजन':'swelling',
+    },
+    'Tamil': {
+        'kaichal':'fever','kaaichal':'fever','juram':'fever','irumal':'cough','sali':'cold',
+        'jaladosham':'cold','vanthi':'vomiting','vaanthi':'vomiting','vayitru pokku':'diarrhea',
+        'thalai suthal':'dizziness','mayakkam':'dizziness','sorvu':'weakness','arippu':'itching',
+        'veekkam':'swelling','moochu thinaral':'breathlessness','sugar':'diabetes',
+        'காய்ச்சல்':'fever','இருமல்':'cough','சளி':'cold','வாந்தி':'vomiting','மயக்கம்':'dizziness',
+        'சோர்வு':'weakness','அரிப்பு':'itching','வீக்கம்':'swelling',
+    },
+    'Malayalam': {
+        'pani':'fever','irumal':'cough','chuma':'cough','jaladosham':'cold','oki':'vomiting',
+        'chardi':'vomiting','chardhi':'vomiting','vayarilakkam':'diarrhea','thalakarakkam':'dizziness',
+        'ksheenam':'weakness','chorichil':'itching','neeru':'swelling','shwasamuttal':'breathlessness',
+        'sugar':'diabetes',
+        'പനി':'fever','ചുമ':'cough','ജലദോഷം':'cold','ഛർദ്ദി':'vomiting','വയറിളക്കം':'diarrhea',
+        'തലകറക്കം':'dizziness','ക്ഷീണം':'weakness','ചൊറിച്ചിൽ':'itching','നീര്':'swelling',
+    },
+}
+
+# ── Words that carry no symptom meaning and can be dropped safely ────────────
+# Severity words ("severe") must NOT go here: they are left over so the
+# transcript reaches the LLM and emergency phrases like "severe pain" survive.
+FILLER = {
+    'English':   {'i','have','has','had','am','is','are','my','me','a','an','the','and','also','in','on','of',
+                  'some','very','lot','little','bit','from','since','with','feel','feeling','getting','got',
+                  'there','mild','too','much','lots','problem','issue','both','left','right','side',
+                  'for','day','days','week','weeks','month','today','yesterday','morning','night'},
+    'Telugu':    {'naaku','naku','na','naa','undi','unnadi','untundi','ga','chala','konchem','mariyu',
+                  'inka','kuda','kooda','vastundi','vastondi','ekkuva','tho','lo','problem','roju','rojulu','నాకు','ఉంది',
+                  'చాలా','కొంచెం','మరియు','కూడా','వస్తుంది'},
+    'Hindi':     {'mujhe','mera','meri','mere','hai','hain','ho','aa','raha','rahi','bahut','thoda','aur','bhi',
+                  'me','mein','ka','ki','ke','se','problem','din','dino','मुझे','मेरा','मेरी','मेरे','है','हैं','हो','रहा',
+                  'रही','बहुत','थोड़ा','और','भी','में','का','की','के','से'},
+    'Tamil':     {'enakku','ennaku','en','irukku','iruku','romba','konjam','matrum','um','la','le','problem','naal','naala','naalaa',
+                  'எனக்கு','என்','இருக்கு','ரொம்ப','கொஞ்சம்','மற்றும்'},
+    'Malayalam': {'enikku','enik','ente','und','undu','valare','kurachu','um','il','problem','divasam','divasamayi',
+                  'എനിക്ക്','എന്റെ','ഉണ്ട്','വളരെ','കുറച്ച്'},
+}
+
+# Part + pain overrides where medicine has its own word
+COMPOUND_TERM = {'head':'headache','body':'body pain','tooth':'toothache','ear':'ear pain','throat':'throat pain'}
+MAX_TERMS     = 4
+# Latin words, or runs of Devanagari…Malayalam letters incl. vowel signs, viramas and ZWJ/ZWNJ
+TOKEN_RE      = re.compile(r"[a-z]+|[\u0900-\u0DFF\u200c\u200d]+")
+
+def _merged(table, lang):
+    # The detected language is a hint, not a guarantee — patients code-mix —
+    # so English and the detected language load in full and every other
+    # language only in its native script. Romanised entries of other
+    # languages collide with English words ('sir', 'pet', 'pair', 'pal').
+    others = [l for l in table if l not in ('English', lang)]
+    layers = [table['English']] + [_native(table[l]) for l in others] + [table.get(lang, {})]
+    if isinstance(table['English'], dict):
+        out = {}
+        for layer in layers: out.update(layer)
+    else:
+        out = set()
+        for layer in layers: out |= set(layer)
+    return out
+
+def _native(entries):
+    if isinstance(entries, dict): return {k: v for k, v in entries.items() if not k.isascii()}
+    return {k for k in entries if not k.isascii()}
+
+class SymptomLexicon:
+    """Precompiled lookup tables for one preferred language."""
+
+    def __init__(self, lang):
+        self.body     = _merged(BODY, lang)
+        self.pain     = _merged(PAIN, lang)
+        self.symptoms = _merged(SYMPTOMS, lang)
+        self.filler   = _merged(FILLER, lang)
+        # Two-word phrases ("loose motions", "tala tirugudu") are matched first
+        self.phrases  = {k:v for k,v in self.symptoms.items() if ' ' in k}
+        self.longest  = max([len(k.split()) for k in self.phrases] or [1])
+
+    def _split_compound(self, tok):
+        # "thalaivali" / "தலைவலி" = body part glued to a pain word
+        for i in range(2, len(tok) - 1):
+            head, tail = tok[:i], tok[i:]
+            if head in self.body and tail in self.pain:
+                return self.body[head]
+        return None
+
+    def translate(self, text):
+        """Return (terms, leftovers). `terms` are English symptom terms in
+        spoken order; `leftovers` are words the lexicon could not place."""
+        toks  = TOKEN_RE.findall(text.lower())
+        terms, leftovers, bodies, loose_pain = [], [], [], False
+        i = 0
+
+        def add(term):
+            if term not in terms: terms.append(term)
+
+        def pain_for(part):
+            add(COMPOUND_TERM.get(part, part + ' pain'))
+
+        while i < len(toks):
+            hit = None
+            for n in range(min(self.longest, len(toks) - i), 1, -1):
+                phrase = ' '.join(toks[i:i+n])
+                if phrase in self.phrases:
+                    hit = (self.phrases[phrase], n); break
+            if hit:
+                add(hit[0]); i += hit[1]; continue
+            tok = toks[i]; i += 1
+            if tok in self.pain:
+                if bodies:
+                    for b in bodies: pain_for(b)
+                    bodies = []
+                else:
+                    loose_pain = True
+            elif tok in self.body:
+                if loose_pain:                   # "pain in my knee"
+                    pain_for(self.body[tok]); loose_pain = False
+                else:
+                    bodies.append(self.body[tok])
+            elif tok in self.symptoms:
+                add(self.symptoms[tok])
+            elif tok in self.filler:
+                continue
+            else:
+                part = self._split_compound(tok)
+                if part: pain_for(part)
+                else:    leftovers.append(tok)
+        if loose_pain: add('body pain')
+        # A body part with no pain word is ambiguous — let the LLM decide
+        leftovers.extend(bodies)
+        return terms[:MAX_TERMS], leftovers
+
+_LEXICONS = {}
+_VOCAB    = set()
+
+def _lexicon(lang):
+    lex = _LEXICONS.get(lang)
+    if lex is None:
+        lex = _LEXICONS[lang] = SymptomLexicon(lang)
+    return lex
+
+def translate_symptoms(text, lang='English'):
+    return _lexicon(lang).translate(text)
+
+def known_word(tok):
+    """True if `tok` (lowercase) is lexicon vocabulary in any language —
+    symptom, body-part, pain or filler words, never names or places."""
+    if not _VOCAB:
+        for table in (BODY, SYMPTOMS):
+            for entries in table.values():
+                for k, v in entries.items(): _VOCAB.update(TOKEN_RE.findall(k + ' ' + v))
+        for table in (PAIN, FILLER):
+            for entries in table.values():
+                for k in entries: _VOCAB.update(TOKEN_RE.findall(k))
+        for v in COMPOUND_TERM.values(): _VOCAB.update(TOKEN_RE.findall(v))
+    return tok in _VOCAB or any(_lexicon(l)._split_compound(tok) is not None for l in BODY)
+
+def resolve_locally(text, lang='English', keep=()):
+    """Comma-separated English terms, or None if the LLM is still needed.
+    Any phrase in `keep` (the emergency words) that the transcript contains
+    must come out verbatim, otherwise the transcript goes to the LLM."""
+    terms, leftovers = translate_symptoms(text, lang)
+    if not terms or leftovers:
+        return None
+    out   = ', '.join(terms)
+    lower = text.lower()
+    if any(p in lower and p not in out for p in keep):
+        return None
+    return out
+
+def emergency_leaks(phrases, langs=None):
+    """Emergency phrases the lexicon alone would lose, alone or in a
+    sentence, as [(lang, transcript, resolved)] — should always be empty."""
+    leaks = []
+    for lang in langs or BODY:
+        for p in phrases:
+            for text in (p, f'i have {p}', f'{p} since morning', f'very {p} in my body'):
+                out = resolve_locally(text, lang)
+                if out is not None and p not in out:
+                    leaks.append((lang, text, out))
+    return leaks
+
+# ─────────────────────────────
+#  COVERAGE / LATENCY REPORT
+# ─────────────────────────────
+def _load_corpus(path):
+    rows = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'): continue
+            lang, _, text = line.partition('\t') if '\t' in line else ('English', '', line)
+            rows.append((lang.strip() or 'English', text.strip()))
+    return rows
+
+def report(rows, repeat=200):
+    by_lang, unresolved = {}, {}
+    for lang, text in rows:
+        hit = resolve_locally(text, lang) is not None
+        s = by_lang.setdefault(lang, [0, 0])
+        s[0] += 1; s[1] += hit
+        if not hit:
+            for w in translate_symptoms(text, lang)[1]:
+                unresolved[w] = unresolved.get(w, 0) + 1
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for lang, text in rows: resolve_locally(text, lang)
+    per_call = (time.perf_counter() - start) / max(1, repeat * len(rows)) * 1e6
+
+    total = sum(s[0] for s in by_lang.values())
+    local = sum(s[1] for s in by_lang.values())
+    print(f"{'language':<12}{'transcripts':>12}{'local':>8}{'coverage':>10}")
+    for lang, (n, h) in sorted(by_lang.items()):
+        print(f"{lang:<12}{n:>12}{h:>8}{h/n:>9.0%}")
+    print(f"{'TOTAL':<12}{total:>12}{local:>8}{(local/total if total else 0):>9.0%}")
+    print(f"\nLLM calls removed: {local}/{total}  ·  local translate: {per_call:.1f} µs/transcript")
+    if unresolved:
+        top = sorted(unresolved.items(), key=lambda kv: -kv[1])[:15]
+        print("Top unresolved words: " + ', '.join(f"{w}({n})" for w, n in top))
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print(__doc__.strip()); sys.exit(1)
+    report(_load_corpus(sys.argv[1]))
@@ -0,0 +1,26 @@
+import os, sys
+
+# Backend modules import each other as top-level modules (python backend/app.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('GROQ_API_KEY', 'test')
+
+import pytest
+
+@pytest.fixture
+def site(tmp_path):
+    """A fresh built-in-catalog site on its own temporary shard."""
+    import app
+    s = app.Site('test', 'Test', app.DEPTS, app.EM_WORDS, app.SMS_TPL, str(tmp_path / 'test.db'), 'pw')
+    app.init_db(s)
+    s.sched = app.QueueScheduler(s)
+    return s
+
+@pytest.fixture
+def client(site, monkeypatch):
+    """Test client serving only `site`, in single-site mode, with batch
+    triage stubbed out (it would call Groq)."""
+    import app
+    from sites import SiteRegistry
+    monkeypatch.setattr(app, 'SITES', SiteRegistry([site], single=True))
+    monkeypatch.setattr(app, 'triage_registration', lambda site, pid: None)
+    return app.app.test_client()
@@ -0,0 +1,51 @@
+import app
+
+def _reg(key, **kw):
+    return dict({'idempotency_key':key,'name':'A','age':'30','mobile':'','symptoms':'fever',
+                 'days':'2','language':'English'}, **kw)
+
+def _batch(client, *items):
+    return client.post('/process/batch', json={'registrations':list(items)})
+
+def test_tokens_are_sequential_within_one_batch(client):
+    res = _batch(client, _reg('k1'), _reg('k2'), _reg('k3')).get_json()
+    assert [r['token_number'] for r in res['results']] == [1, 2, 3]
+    assert _batch(client, _reg('k4')).get_json()['results'][0]['token_number'] == 4
+
+def test_key_repeated_inside_one_batch_is_saved_once(client, site):
+    res = _batch(client, _reg('dup'), _reg('dup')).get_json()
+    assert res['created'] == 1 and res['duplicates'] == 1
+    assert res['results'][0]['token_number'] == res['results'][1]['token_number']
+    with site.db() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM patients").fetchone()[0] == 1
+
+def test_process_retry_after_flush_returns_the_flushed_token(client, site):
+    token = _batch(client, _reg('k1')).get_json()['results'][0]['token_number']
+    res = client.post('/process', json=_reg('k1')).get_json()
+    assert res['duplicate'] and res['token_number'] == token and res['triage'] == 'pending'
+    with site.db() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM patients").fetchone()[0] == 1
+
+def test_malformed_items_are_rejected_alone(client):
+    res = _batch(client, _reg('ok1'), _reg('bad', symptoms=5.5), _reg('bad2', name=['x']),
+                 'not an object', _reg('', name='B'), _reg('ok2', age=40)).get_json()
+    assert res['created'] == 3 and res['rejected'] == 3
+    statuses = [r.get('status') for r in res['results']]
+    assert statuses == [None, None, 400, 400, 400, None]
+    assert res['results'][1]['token_number'] == 2          # 5.5 is coerced to '5.5'
+    assert res['results'][2]['idempotency_key'] == 'bad2'
+
+def test_worker_resumes_untriaged_rows_at_boot(site, monkeypatch):
+    from sites import SiteRegistry
+    with site.db() as conn:
+        c = conn.cursor()
+        app.insert_patient(c, {'department':''}, 'R1', 1, 'pending-key')
+        app.insert_patient(c, {'department':'Cardiology'}, 'R2', 2, 'done-key')
+        conn.commit()
+    seen = []
+    monkeypatch.setattr(app, 'SITES', SiteRegistry([site], single=True))
+    monkeypatch.setattr(app, 'triage_registration', lambda s, pid: seen.append((s, pid)))
+    monkeypatch.setattr(app, '_triage_alive', False)
+    app.start_triage_worker()
+    app._triage_jobs.join()
+    assert [pid for s, pid in seen if s is site] == [1]
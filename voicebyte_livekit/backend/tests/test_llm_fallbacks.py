@@ -0,0 +1,23 @@
+import pytest
+
+import app
+
+@pytest.fixture
+def busy_llm(monkeypatch):
+    def ask_groq(*args, **kwargs):
+        raise TimeoutError('LLM request still queued/running after 45s')
+    monkeypatch.setattr(app, 'ask_groq', ask_groq)
+    return app.app.test_client()
+
+@pytest.mark.parametrize('field, transcript, expected', [
+    ('age', 'not sure really', 'Unknown'),
+    ('days', 'quite a while', '1 day'),
+    ('symptoms', 'something strange happened', 'general complaint'),
+])
+def test_extract_falls_back_when_the_llm_times_out(busy_llm, field, transcript, expected):
+    res = busy_llm.post('/extract', json={'field':field, 'transcript':transcript, 'lang':'English'})
+    assert res.status_code == 200 and res.get_json()['extracted'] == expected
+
+def test_detect_language_defaults_to_english(busy_llm):
+    res = busy_llm.post('/detect-language', json={'transcript':'namaste'})
+    assert res.status_code == 200 and res.get_json()['language'] == 'English'
@@ -0,0 +1,84 @@
+import threading, time
+
+import pytest
+
+from llm_scheduler import WINDOW_SLACK, LLMScheduler, WindowLimit, simulate
+
+def test_lanes_run_in_priority_order():
+    order, gate = [], threading.Event()
+
+    def upstream(system_prompt, user_msg, max_tok):
+        if user_msg == 'first': gate.wait(5)   # hold the only worker while the queue fills
+        order.append(user_msg)
+        return user_msg, 10
+
+    sched = LLMScheduler(upstream, concurrency=1, rpm=1000, tpm=10**6)
+    threads = [threading.Thread(target=sched.submit, args=('sys', 'first'), kwargs={'lane':'background'})]
+    threads[0].start()
+    while not order and sched.stats()['running'] == 0: time.sleep(0.01)
+    for msg, lane in (('bg', 'background'), ('int', 'interactive'), ('tri', 'triage')):
+        t = threading.Thread(target=sched.submit, args=('sys', msg), kwargs={'lane':lane})
+        t.start(); threads.append(t)
+    while sum(sched.stats()['queue_depth'].values()) < 3: time.sleep(0.01)
+    gate.set()
+    for t in threads: t.join(5)
+    assert order == ['first', 'tri', 'int', 'bg']
+
+def test_identical_requests_are_coalesced():
+    calls = []
+    def upstream(system_prompt, user_msg, max_tok):
+        calls.append(user_msg); time.sleep(0.2)
+        return 'ok', 10
+    sched = LLMScheduler(upstream, concurrency=2, rpm=1000, tpm=10**6)
+    threads = [threading.Thread(target=sched.submit, args=('sys', 'same')) for _ in range(5)]
+    for t in threads: t.start()
+    for t in threads: t.join(5)
+    assert calls == ['same']
+    assert sched.stats()['coalesced'] == 4
+
+def test_fake_upstream_at_quota():
+    # 1.5x the quota offered against an upstream that 429s anything over its
+    # limit, using the scheduler exactly as app.py builds it, fresh — no
+    # pre-drained limits. The window is shortened so the run spans four.
+    import app
+    s = simulate(seconds=8, rpm=20, tpm=10**6, clients=24, overload=1.5, window=2.0,
+                 make=app.make_llm_scheduler)
+    assert s['rejected'] == 0
+    assert s['rate'] >= 0.9 * 20
+    assert s['served']['triage'] >= s['served']['interactive'] >= s['served']['background']
+
+def test_idle_burst_never_exceeds_the_window():
+    clock = [0.0]
+    limit = WindowLimit(10, window=60, clock=lambda: clock[0])
+    for _ in range(10):
+        assert limit.wait_time(1) == 0
+        limit.take(1)
+    clock[0] = 59.0                     # a token bucket would have refilled ~10 by now
+    assert limit.wait_time(1) > 0
+    clock[0] = 60 * (1 + WINDOW_SLACK) + 0.01
+    assert limit.wait_time(1) == 0
+
+def test_settle_replaces_the_estimate():
+    clock = [0.0]
+    limit = WindowLimit(100, clock=lambda: clock[0])
+    entry = limit.take(80)
+    limit.settle(entry, 30)
+    assert limit.available == 70
+
+def test_timed_out_callers_cancel_queued_jobs():
+    gate, calls = threading.Event(), []
+    def upstream(system_prompt, user_msg, max_tok):
+        calls.append(user_msg)
+        if user_msg == 'first': gate.wait(5)
+        return user_msg, 10
+    sched = LLMScheduler(upstream, concurrency=1, rpm=1000, tpm=10**6)
+    t = threading.Thread(target=sched.submit, args=('sys', 'first'))
+    t.start()
+    while not calls: time.sleep(0.01)
+    with pytest.raises(TimeoutError):
+        sched.submit('sys', 'abandoned', timeout=0.1)
+    gate.set(); t.join(5)
+    assert sched.submit('sys', 'next', timeout=5) == 'next'
+    assert calls == ['first', 'next']
+    assert sched.stats()['cancelled'] == 1
+    assert sched.stats()['queue_depth'] == {'triage':0, 'interactive':0, 'background':0}
@@ -0,0 +1,72 @@
+import time
+
+from app import DEFAULT_SERVICE, SERVICE_ALPHA, DeptQueue, insert_patient
+
+def _row(pid, token, emergency=0, priority='Normal', dept='General Medicine'):
+    return {'id':pid,'token_number':token,'emergency':emergency,'priority':priority,'department':dept}
+
+def test_order_is_emergency_then_high_then_token():
+    q = DeptQueue('General Medicine')
+    q.push(_row(1, 1)); q.push(_row(2, 2, priority='High')); q.push(_row(3, 3, emergency=1)); q.push(_row(4, 4))
+    assert q.order() == [3, 2, 1, 4]
+    assert [q.pop() for _ in range(5)] == [3, 2, 1, 4, None]
+
+def test_lazy_removal_skips_discarded_and_repushed_entries():
+    q = DeptQueue('General Medicine')
+    for pid in (1, 2, 3): q.push(_row(pid, pid))
+    q.discard(1)
+    q.push(_row(3, 3, emergency=1))     # re-push replaces the stale entry
+    assert q.peek() == 3
+    assert [q.pop(), q.pop(), q.pop()] == [3, 2, None]
+
+def test_service_time_is_an_ewma():
+    q = DeptQueue('Cardiology')
+    q.record_service(300)
+    assert q.service == SERVICE_ALPHA * 300 + (1 - SERVICE_ALPHA) * DEFAULT_SERVICE
+    q.record_service(0)                 # ignored
+    assert q.service == SERVICE_ALPHA * 300 + (1 - SERVICE_ALPHA) * DEFAULT_SERVICE
+
+def _add(site, pid, token, dept, **kw):
+    row = _row(pid, token, dept=dept, **kw)
+    site.sched.enqueue(row)
+    return row
+
+def test_next_for_doctor_and_across_departments(site):
+    _add(site, 1, 1, 'Cardiology')
+    _add(site, 2, 2, 'Orthopedics', priority='High')
+    _add(site, 3, 3, 'Cardiology', emergency=1)
+    doctor = site.depts['Orthopedics']['doctor']
+    assert site.sched.next_for(doctor=doctor) == 2
+    assert site.sched.next_for(doctor='Dr. Nobody') is None
+    assert site.sched.next_for() == 3
+    assert site.sched.next_for('Cardiology') == 1
+    assert site.sched.next_for() is None
+
+def test_wait_estimates_follow_position_and_service_time(site):
+    for pid in (1, 2, 3): _add(site, pid, pid, 'Neurology')
+    q = site.sched.snapshot('Neurology')['Neurology']
+    assert [e['est_wait_min'] for e in q['queue']] == [0, 10, 20]
+    site.sched.mark_called(_row(1, 1, dept='Neurology'), time.time())
+    q = site.sched.snapshot('Neurology')['Neurology']
+    assert q['with_doctor'] == 1 and [e['id'] for e in q['queue']] == [2, 3]
+    assert [e['est_wait_min'] for e in q['queue']] == [10, 20]
+
+def test_recalling_a_seen_patient_does_not_occupy_the_doctor(site):
+    row = _add(site, 1, 1, 'Neurology')
+    now = time.time()
+    site.sched.mark_called(row, now - 300)
+    site.sched.mark_seen(row, now)
+    site.sched.mark_called(row, now)    # token called again after being seen
+    q = site.sched.queues['Neurology']
+    assert q.current == {}
+    assert q.remaining_current(now) == 0
+
+def test_hydrates_waiting_rows_from_the_shard(site):
+    with site.db() as conn:
+        c = conn.cursor()
+        for token, dept in ((1, 'Cardiology'), (2, '')):   # '' = batch row awaiting triage
+            insert_patient(c, {'department':dept,'priority':'Normal'}, f'R{token}', token)
+        conn.commit()
+    site.sched.day = None
+    assert site.sched.next_for() == 1
+    assert site.sched.next_for() is None
@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+from sites import Site, load_sites
+
+DEPTS = {'Emergency':        {'floor':0,'fw':'Ground Floor','doctor':'Dr. A','words':['trauma']},
+         'General Medicine': {'floor':1,'fw':'First Floor','doctor':'Dr. B','words':['fever']}}
+
+def _write(tmp_path, site_id, **cfg):
+    cfg = dict({'id':site_id,'departments':DEPTS,'db_path':str(tmp_path / f'{site_id}.db'),
+                'admin_password':f'pw-{site_id}','kiosks':[f'{site_id}-k1']}, **cfg)
+    (tmp_path / f'{site_id}.json').write_text(json.dumps(cfg))
+
+@pytest.fixture
+def default_site(tmp_path):
+    return Site('default', 'VoiceByte', DEPTS, ['trauma'], {'registration':{'English':'{t}'}},
+                str(tmp_path / 'default.db'), 'pw')
+
+def test_no_config_runs_the_built_in_site(tmp_path, default_site):
+    reg = load_sites(str(tmp_path), default_site)
+    assert reg.resolve() is default_site
+    assert reg.for_admin_key('pw') is default_site
+    assert reg.for_admin_key('wrong') is None and reg.for_admin_key(None) is None
+
+def test_sites_resolve_by_kiosk_and_admin_key(tmp_path, default_site):
+    _write(tmp_path, 'a'); _write(tmp_path, 'b')
+    reg = load_sites(str(tmp_path), default_site)
+    assert reg.resolve(kiosk_id='b-k1').id == 'b'
+    assert reg.for_admin_key('pw-a').id == 'a'
+    assert reg.resolve(kiosk_id='unknown') is None
+    assert reg.for_admin_key('pw') is None
+
+def test_duplicate_admin_passwords_are_rejected(tmp_path, default_site):
+    _write(tmp_path, 'a', admin_password='shared'); _write(tmp_path, 'b', admin_password='shared')
+    with pytest.raises(ValueError, match='admin password'):
+        load_sites(str(tmp_path), default_site)
+
+def test_shared_db_path_is_rejected(tmp_path, default_site):
+    _write(tmp_path, 'a', db_path=str(tmp_path / 'x.db')); _write(tmp_path, 'b', db_path=str(tmp_path / 'x.db'))
+    with pytest.raises(ValueError, match='db_path'):
+        load_sites(str(tmp_path), default_site)
+
+ADMIN_ROUTES = [('get', '/patients'), ('get', '/admin/queue'), ('get', '/admin/queues'),
+                ('get', '/admin/stats'), ('get', '/admin/llm'),
+                ('post', '/admin/call'), ('post', '/admin/call-next')]
+
+@pytest.mark.parametrize('method,path', ADMIN_ROUTES)
+def test_single_site_admin_routes_need_the_password(client, method, path):
+    send = getattr(client, method)
+    assert send(path).status_code == 401
+    assert send(path, headers={'X-Admin-Key':'wrong'}).status_code == 401
+    assert send(path + '?key=wrong').status_code == 401
+    assert send(path, headers={'X-Admin-Key':'pw'}, json={}).status_code != 401
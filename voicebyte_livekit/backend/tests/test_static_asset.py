@@ -0,0 +1,36 @@
+import pytest
+
+from app import StaticAsset, accepted_encodings, app
+
+BODY = 'body { color: red; }\n' * 200
+
+@pytest.fixture
+def asset():
+    return StaticAsset(BODY, 'text/css')
+
+def _get(asset, **headers):
+    with app.test_request_context('/', headers=headers):
+        return asset.response()
+
+def test_accept_encoding_honours_q_values():
+    ok = accepted_encodings('gzip;q=0, br ; q=0.5, identity')
+    assert not ok('gzip') and ok('br') and ok('identity')
+    ok = accepted_encodings('*;q=0.1, br;q=0')
+    assert ok('gzip') and not ok('br')
+    assert not accepted_encodings('')('gzip')
+    assert not accepted_encodings('xgzip')('gzip')     # no substring matches
+
+def test_negotiates_gzip_and_skips_refused_codings(asset):
+    r = _get(asset, **{'Accept-Encoding': 'gzip'})
+    assert r.headers['Content-Encoding'] == 'gzip' and r.headers['ETag'] == asset.etag('gzip')
+    r = _get(asset, **{'Accept-Encoding': 'gzip;q=0'})
+    assert 'Content-Encoding' not in r.headers and r.headers['ETag'] == asset.etag('identity')
+
+def test_304_only_for_the_negotiated_variant(asset):
+    gz_tag = asset.etag('gzip')
+    assert _get(asset, **{'Accept-Encoding': 'gzip', 'If-None-Match': gz_tag}).status_code == 304
+    # Holding the gzip ETag says nothing about the identity body
+    r = _get(asset, **{'If-None-Match': gz_tag})
+    assert r.status_code == 200 and r.headers['ETag'] == asset.etag('identity')
+    assert _get(asset, **{'If-None-Match': asset.etag('identity')}).status_code == 304
+    assert _get(asset, **{'If-None-Match': '*'}).status_code == 304
@@ -0,0 +1,38 @@
+from symptom_lexicon import emergency_leaks, known_word, resolve_locally
+
+def test_every_emergency_phrase_survives_local_resolution():
+    import app
+    assert emergency_leaks(app.EM_PHRASES) == []
+
+def test_severity_words_go_to_the_llm():
+    assert resolve_locally('I have severe pain') is None
+    assert resolve_locally('severe pain in chest') is None
+
+def test_keep_phrases_force_the_llm_when_dropped():
+    # "stomach pain" is a fine local answer, but not if an emergency word was in the transcript
+    assert resolve_locally('stomach pain', keep=('stomach ache',)) == 'stomach pain'
+    assert resolve_locally('my heart has pain', keep=('heart',)) is None
+
+def test_common_complaints_still_resolve_locally():
+    assert resolve_locally('tala noppi jwaram', 'Telugu') == 'headache, fever'
+    assert resolve_locally('pet me dard', 'Hindi') == 'stomach pain'
+
+def test_english_homographs_of_romanised_words_go_to_the_llm():
+    # 'sir' (Hindi head), 'pet' (stomach), 'pair' (leg), 'pal' (Tamil tooth), 'kan' (Tamil eye)
+    assert resolve_locally('sir I have stomach pain', 'English') is None
+    assert resolve_locally('my pet has pain', 'English') is None
+    assert resolve_locally('a pair of pain', 'English') is None
+    assert resolve_locally('pal pain', 'English') is None
+    assert resolve_locally('kan pain and fever', 'English') is None
+
+def test_romanised_words_still_resolve_in_their_own_language():
+    assert resolve_locally('sir dard', 'Hindi') == 'headache'
+    assert resolve_locally('pet me dard', 'Hindi') == 'stomach pain'
+    assert resolve_locally('kan vali', 'Tamil') == 'eye pain'
+
+def test_native_script_resolves_whatever_language_was_detected():
+    assert resolve_locally('पेट दर्द', 'English') == 'stomach pain'
+    assert resolve_locally('தலைவலி', 'Hindi') == 'headache'
+
+def test_known_word_covers_every_language():
+    assert known_word('pet') and known_word('thalaivali') and not known_word('ravi')
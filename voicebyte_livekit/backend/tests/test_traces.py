@@ -0,0 +1,67 @@
+import json, threading
+
+from flask import Flask, jsonify
+
+from traces import REPLAY_HEADER, TraceRecorder, redact
+
+def test_names_in_symptom_speech_are_masked():
+    body = redact('/extract', {'field':'symptoms',
+                               'transcript':'I am Ravi Kumar from Guntur, my knee has swelling'})
+    text = body['transcript']
+    for word in ('ravi', 'kumar', 'guntur'):
+        assert word not in text
+    assert 'knee' in text and 'swelling' in text
+    assert len(text) == len('I am Ravi Kumar from Guntur, my knee has swelling')
+
+def test_mobile_digits_are_scrubbed():
+    body = redact('/process', {'name':'Ravi','mobile':'9876543210',
+                               'symptoms':'call 9876543210 fever since monday'})
+    assert body['name'] == 'Patient'
+    assert body['mobile'] == '0000000000'
+    assert '9876543210' not in body['symptoms'] and 'fever' in body['symptoms']
+
+def test_replay_serves_recorded_results_in_order(tmp_path, capsys):
+    path = tmp_path / 'trace.jsonl'
+    path.write_text(json.dumps({'id':'r1','upstream':[
+        {'kind':'groq','result':'first','ms':0}, {'kind':'gtts','bytes':3,'ms':0},
+        {'kind':'groq','result':'second','ms':0}]}) + '\n', encoding='utf-8')
+    rec = TraceRecorder(replay_path=str(path))
+    assert 'WARNING' in capsys.readouterr().out
+
+    def unreachable(): raise AssertionError('replay must not call upstream')
+    web = Flask(__name__)
+    rec.init_app(web)
+
+    @web.route('/run', methods=['POST'])
+    def run():
+        a = rec.upstream('groq', unreachable)
+        b = rec.upstream('groq', unreachable)
+        audio = rec.upstream('gtts', unreachable)
+        return jsonify([a, b, len(audio)])
+
+    res = web.test_client().post('/run', headers={REPLAY_HEADER:'r1'})
+    assert res.get_json() == ['first', 'second', 3]
+
+def test_work_handed_off_past_the_response_is_recorded(tmp_path):
+    rec = TraceRecorder(trace_dir=str(tmp_path))
+    web = Flask(__name__)
+    rec.init_app(web)
+    gate, workers = threading.Event(), []
+
+    def background(ctx):
+        gate.wait(5)
+        with rec.resume(ctx):
+            rec.upstream('groq', lambda: 'triaged')
+
+    @web.route('/process/batch', methods=['POST'])
+    def batch():
+        t = threading.Thread(target=background, args=(rec.handoff(),))
+        t.start(); workers.append(t)
+        return jsonify({'created':1})
+
+    web.test_client().post('/process/batch', json={'registrations':[]})
+    assert rec.file.tell() == 0                 # held open until triage finishes
+    gate.set(); workers[0].join(5)
+    entries = [json.loads(l) for l in open(rec.file.name, encoding='utf-8')]
+    assert len(entries) == 1 and entries[0]['status'] == 200
+    assert [u['result'] for u in entries[0]['upstream']] == ['triaged']
@@ -0,0 +1,279 @@
+"""
+VoiceByte — request trace capture and replay mode
+Opt-in, off by default:
+
+  VOICEBYTE_TRACE_DIR=traces python backend/app.py
+      Appends one JSON line per API request to traces/trace-<time>.jsonl:
+      arrival offset, endpoint, PII-redacted payload, status, latency and
+      every upstream call it made (Groq text, gTTS byte count, SMS result)
+      with that call's own latency. Groq latency is the upstream call only;
+      time queued in the LLM scheduler is left for the replayed build to
+      reproduce on its own.
+
+  VOICEBYTE_REPLAY=traces/trace-….jsonl python backend/app.py
+      Never touches Groq, gTTS or Fast2SMS. A request carrying
+      X-VoiceByte-Replay: <trace id> gets that entry's recorded upstream
+      results, in order, after sleeping the recorded upstream latency
+      divided by X-VoiceByte-Replay-Speed. Drive it with replay.py.
+
+Each entry records the site and kiosk the request resolved to (never the
+admin password); replay sends them back as X-VoiceByte-Site / X-Kiosk-Id.
+Admin routes in replay mode therefore accept any request carrying both
+replay headers, with no password: replay only on a private machine.
+
+Batch triage runs after the batch response; its upstream calls are still
+recorded under (and replayed from) the batch request's entry, which is
+written once that triage finishes.
+"""
+import json, os, re, threading, time, uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+from symptom_lexicon import TOKEN_RE, known_word
+
+REPLAY_HEADER = 'X-VoiceByte-Replay'
+SPEED_HEADER  = 'X-VoiceByte-Replay-Speed'
+SITE_HEADER   = 'X-VoiceByte-Site'
+KIOSK_HEADER  = 'X-Kiosk-Id'
+SKIP_PATHS    = ('/assets/', '/health')
+DIGITS_RE     = re.compile(r'\d{6,}')
+
+# ─────────────────────────────
+#  PII REDACTION
+# ─────────────────────────────
+def _mask(value):
+    # Keep the length (it drives parsing cost) but none of the content
+    return 'x' * len(value) if isinstance(value, str) else value
+
+def _scrub(value):
+    return DIGITS_RE.sub(lambda m: '0' * len(m.group()), value) if isinstance(value, str) else value
+
+def _vocab_only(value, allow=frozenset()):
+    # Free speech: keep symptom vocabulary (so local resolution replays the
+    # same way), mask every other word — names, places — to its length
+    if not isinstance(value, str): return value
+    return _scrub(TOKEN_RE.sub(lambda m: m.group() if known_word(m.group()) or m.group() in allow
+                               else 'x' * len(m.group()), value.lower()))
+
+def _redact_registration(item, allow):
+    item = dict(item)
+    if 'name' in item:   item['name']   = 'Patient'
+    if 'mobile' in item: item['mobile'] = _scrub(str(item['mobile']))
+    if 'symptoms' in item: item['symptoms'] = _vocab_only(item['symptoms'], allow)
+    return item
+
+def redact(path, body, allow=frozenset()):
+    """Strip names, phone numbers and free speech that may identify a patient.
+    `allow` adds words (emergency / department vocabulary) kept verbatim."""
+    if not isinstance(body, dict): return body
+    body = dict(body)
+    if path == '/extract':
+        if body.get('field') in ('name', 'mobile'): body['transcript'] = _mask(body.get('transcript', ''))
+        else:                                       body['transcript'] = _vocab_only(body.get('transcript', ''), allow)
+    elif path in ('/detect-language', '/tts'):
+        for k in ('transcript', 'text'):
+            if k in body: body[k] = _mask(body[k])
+    elif path == '/process':
+        body = _redact_registration(body, allow)
+    elif path == '/process/batch' and isinstance(body.get('registrations'), list):
+        body['registrations'] = [_redact_registration(r, allow) if isinstance(r, dict) else r
+                                 for r in body['registrations']]
+    return body
+
+def endpoint_name(method, path, body):
+    # /extract is five different workloads — split it by field
+    name = f"{method} {path}"
+    if path == '/extract' and isinstance(body, dict) and body.get('field'):
+        name += ':' + str(body['field'])
+    return name
+
+# ─────────────────────────────
+#  CAPTURE / REPLAY
+# ─────────────────────────────
+class TraceRecorder:
+    """Wraps upstream calls; records them (capture), serves them (replay)
+    or just runs them (default).
+
+    Each API request gets a context. Work done for it on another thread
+    (the LLM scheduler's workers) runs under `bind(contexts)` so its
+    upstream calls land in — or are served from — the right entries."""
+
+    def __init__(self, trace_dir=None, replay_path=None):
+        self.local   = threading.local()
+        self.lock    = threading.Lock()
+        self.file    = None
+        self.replay  = None
+        self.allow   = set()
+        self.started = time.time()
+        if replay_path:
+            self.replay = {}
+            with open(replay_path, encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        e = json.loads(line)
+                        self.replay[e['id']] = e.get('upstream', [])
+            print(f"[TRACE] replay mode — {len(self.replay)} requests from {replay_path}")
+            print(f"[TRACE] WARNING: replay mode trusts {SITE_HEADER} for admin routes — "
+                  f"never run it on a host anyone else can reach")
+        elif trace_dir:
+            os.makedirs(trace_dir, exist_ok=True)
+            path = os.path.join(trace_dir, f"trace-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.jsonl")
+            self.file = open(path, 'a', encoding='utf-8')
+            print(f"[TRACE] capturing to {path}")
+
+    @classmethod
+    def from_env(cls):
+        return cls(os.getenv('VOICEBYTE_TRACE_DIR'), os.getenv('VOICEBYTE_REPLAY'))
+
+    @property
+    def active(self):
+        return self.file is not None or self.replay is not None
+
+    def allow_words(self, phrases):
+        """Medical vocabulary (emergency words, department keywords) that
+        redaction keeps verbatim alongside the symptom lexicon."""
+        for p in phrases: self.allow.update(TOKEN_RE.findall(p.lower()))
+
+    def init_app(self, app):
+        if not self.active: return
+        from flask import request
+
+        @app.before_request
+        def _trace_start():
+            self.local.ctx = None
+            if request.path.startswith(SKIP_PATHS): return
+            if self.replay is not None:
+                rid = request.headers.get(REPLAY_HEADER)
+                self.local.ctx = {'calls': list(self.replay.get(rid, [])),
+                                  'speed': float(request.headers.get(SPEED_HEADER) or 1) or 1}
+                return
+            body = request.get_json(silent=True)
+            args = {k: v for k, v in request.args.items() if k != 'key'}   # admin password
+            self.local.ctx = {'entry': {
+                'id': uuid.uuid4().hex[:12],
+                't': round(time.time() - self.started, 3),
+                'method': request.method, 'path': request.path, 'query': args,
+                'endpoint': endpoint_name(request.method, request.path, body),
+                'body': redact(request.path, body, self.allow), 'upstream': [],
+                'site': None, 'kiosk': None,
+            }, 't0': time.perf_counter()}
+
+        @app.after_request
+        def _trace_end(response):
+            ctx   = getattr(self.local, 'ctx', None)
+            entry = ctx and ctx.get('entry')
+            if entry is not None:
+                entry['status'] = response.status_code
+                entry['ms']     = round((time.perf_counter() - ctx['t0']) * 1000, 2)
+                entry['bytes']  = response.calculate_content_length() or 0
+                with self.lock:
+                    ctx['done'] = True
+                    if not ctx.get('holds'): self._write(ctx)
+            self.local.ctx = None
+            return response
+
+    def _write(self, ctx):
+        # Caller holds self.lock
+        entry = ctx['entry']
+        # The LLM's answer is as sensitive as the transcript it was asked about
+        if entry['path'] == '/extract' and isinstance(entry['body'], dict):
+            name_like = entry['body'].get('field') in ('name', 'mobile')
+            for u in entry['upstream']:
+                if 'result' in u:
+                    u['result'] = _mask(u['result']) if name_like else _vocab_only(u['result'], self.allow)
+        self.file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self.file.flush()
+        ctx['entry'] = None   # late upstream results (a timed-out wait) are dropped
+
+    def annotate(self, **fields):
+        """Add fields (the resolved site, kiosk) to the current entry."""
+        ctx = getattr(self.local, 'ctx', None)
+        if ctx and ctx.get('entry') is not None: ctx['entry'].update(fields)
+
+    def replayed_site(self):
+        """Replay mode only: the recorded site id of a replayed request.
+        Traces hold no admin passwords, so admin routes resolve by this."""
+        if self.replay is None: return None
+        from flask import request
+        return request.headers.get(SITE_HEADER) if request.headers.get(REPLAY_HEADER) else None
+
+    def context(self):
+        """The current request's context, to hand to another thread."""
+        return getattr(self.local, 'ctx', None)
+
+    def handoff(self):
+        """The current request's context for work queued past its response
+        (batch triage). Capture keeps the entry open until `resume` ends."""
+        ctx = self.context()
+        if ctx is not None and ctx.get('entry') is not None:
+            with self.lock: ctx['holds'] = ctx.get('holds', 0) + 1
+        return ctx
+
+    @contextmanager
+    def resume(self, ctx):
+        """Run a block on this thread as the request `handoff` came from."""
+        prev = getattr(self.local, 'ctx', None)
+        self.local.ctx = ctx
+        try:
+            yield
+        finally:
+            self.local.ctx = prev
+            if ctx is not None and ctx.get('holds'):
+                with self.lock:
+                    ctx['holds'] -= 1
+                    if not ctx['holds'] and ctx.get('done') and ctx.get('entry') is not None:
+                        self._write(ctx)
+
+    @contextmanager
+    def bind(self, contexts):
+        """Run a block on this thread on behalf of `contexts` (one per
+        request sharing the work — coalesced LLM calls have several). The
+        list may still grow while the block runs."""
+        prev = getattr(self.local, 'bound', None)
+        self.local.bound = contexts
+        try:
+            yield
+        finally:
+            self.local.bound = prev
+
+    def _contexts(self):
+        bound = getattr(self.local, 'bound', None)
+        if bound is not None: return [c for c in bound if c is not None]
+        ctx = getattr(self.local, 'ctx', None)
+        return [ctx] if ctx is not None else []
+
+    def upstream(self, kind, fn):
+        """Run `fn()` for an upstream service of type `kind` ('groq', 'gtts',
+        'sms'), recording or replaying its result as configured."""
+        contexts = self._contexts()
+        if self.replay is not None:
+            with self.lock:
+                rec, speed = None, 1
+                for ctx in contexts:
+                    idx = next((i for i, c in enumerate(ctx['calls']) if c['kind'] == kind), None)
+                    if idx is not None:
+                        rec, speed = ctx['calls'].pop(idx), ctx['speed']
+                        break
+            if rec is None:
+                raise RuntimeError(f"replay: no recorded {kind} response for this request")
+            time.sleep(rec.get('ms', 0) / 1000 / speed)
+            if 'error' in rec: raise RuntimeError(rec['error'])
+            if 'bytes' in rec: return b'\0' * rec['bytes']
+            return rec.get('result')
+        if not any(c.get('entry') is not None for c in contexts):
+            return fn()
+        t0  = time.perf_counter()
+        rec = {'kind': kind}
+        try:
+            result = fn()
+            if isinstance(result, (bytes, bytearray)): rec['bytes'] = len(result)
+            else:                                      rec['result'] = result
+            return result
+        except Exception as e:
+            rec['error'] = str(e)
+            raise
+        finally:
+            rec['ms'] = round((time.perf_counter() - t0) * 1000, 2)
+            with self.lock:   # includes requests that joined while the call ran
+                for ctx in self._contexts():
+                    if ctx.get('entry') is not None: ctx['entry']['upstream'].append(dict(rec))